@@ -1,17 +1,87 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+import json
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from app.database.mongodb import cases_collection, moot_problems_collection
 
 router = APIRouter()
 
+LIST_PAGE_MAX = 200
+# Bodies stay out of list views — the single-item endpoints return the full document
+BODY_FIELDS = ("content",)
+FIELD_NAME = re.compile(r"^[A-Za-z0-9_.]+$")
+
+
+# =========================
+# LISTING HELPERS
+# =========================
+def list_projection(fields: Optional[str], base: dict) -> dict:
+    """Default list view is everything but the bodies; ?fields=a,b narrows it further."""
+    if not fields:
+        return {**base, **{field: 0 for field in BODY_FIELDS}}
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    bad = [f for f in wanted if not FIELD_NAME.match(f)]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid field names: {', '.join(sorted(bad))}")
+    return {**base, "id": 1, **{f: 1 for f in sorted(wanted - set(BODY_FIELDS))}}
+
+
+async def list_page(collection, projection: dict, cursor: Optional[str],
+                    limit: Optional[int]) -> Tuple[list, Optional[str]]:
+    """
+    Keyset page ordered by the unique `id` index; the cursor is the last id
+    of the previous page. limit=None returns everything after the cursor.
+    """
+    query = {"id": {"$gt": cursor}} if cursor else {}
+    found = collection.find(query, projection).sort("id", 1)
+    if limit is None:
+        return await found.to_list(length=None), None
+    docs = await found.limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = docs[limit - 1].get("id") if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def body_etag(body) -> str:
+    """Hash of the body being served, so any edit to a returned field changes it."""
+    digest = hashlib.md5(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def validators(request: Request, body) -> Tuple[dict, bool]:
+    """
+    ETag headers for `body` and whether the client already has it. Edits
+    show up whether or not the writer touched a timestamp; the query still
+    runs on a revalidation, only the body is saved.
+    """
+    etag = body_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    return headers, request.headers.get("if-none-match") == etag
+
+
 # =========================
 # GET ALL CASES
 # =========================
 @router.get("/cases")
-async def get_cases():
-    cases = []
-    async for doc in cases_collection.find():
+async def get_cases(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX),
+    fields: Optional[str] = None,
+):
+    # No limit means every case, as before pagination; clients opt in with ?limit=
+    cases, next_cursor = await list_page(cases_collection, list_projection(fields, {}), cursor, limit)
+    for doc in cases:
         doc["_id"] = str(doc["_id"])  # Convert ObjectId to str
-        cases.append(doc)
+    headers, not_modified = validators(request, [cases, next_cursor])
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    if next_cursor is not None:
+        # Body stays a plain list for existing clients; the next page is in a header
+        response.headers["X-Next-Cursor"] = next_cursor
     return cases  # ✅ Return a list
 
 
@@ -19,13 +89,17 @@ async def get_cases():
 # GET SINGLE CASE BY STRING ID
 # =========================
 @router.get("/cases/{case_id}")
-async def get_case(case_id: str):
+async def get_case(case_id: str, request: Request, response: Response):
     # Clean the ID: remove accidental quotes from URL param
     clean_id = case_id.strip("'\"")
     case = await cases_collection.find_one({"id": clean_id})
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     case["_id"] = str(case.get("_id", ""))
+    headers, not_modified = validators(request, case)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return case
 
 
@@ -33,19 +107,35 @@ async def get_case(case_id: str):
 # GET ALL MOOT PROBLEMS
 # =========================
 @router.get("/moot-problems")
-async def get_moot_problems():
-    problems = await moot_problems_collection.find({}, {"_id": 0}).to_list(length=100)
-    return {"moot_problems": problems}
+async def get_moot_problems(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=LIST_PAGE_MAX),
+    fields: Optional[str] = None,
+):
+    projection = list_projection(fields, {"_id": 0})
+    problems, next_cursor = await list_page(moot_problems_collection, projection, cursor, limit)
+    body = {"moot_problems": problems, "next_cursor": next_cursor}
+    headers, not_modified = validators(request, body)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return body
 
 
 # =========================
 # GET SINGLE MOOT PROBLEM BY STRING ID
 # =========================
 @router.get("/moot-problems/{problem_id}")
-async def get_single_problem(problem_id: str):
+async def get_single_problem(problem_id: str, request: Request, response: Response):
     # Clean the ID
     clean_id = problem_id.strip("'\"")
     problem = await moot_problems_collection.find_one({"id": clean_id}, {"_id": 0})
     if not problem:
         raise HTTPException(status_code=404, detail="Moot problem not found")
+    headers, not_modified = validators(request, problem)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return problem
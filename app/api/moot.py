@@ -1,24 +1,45 @@
-import io
-import subprocess
+import hashlib
 import logging
 import random
 import asyncio
 import os
 import json
+import time
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel
 from bson import ObjectId
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
-from fastapi.responses import StreamingResponse
-import base64
+from pymongo import ReturnDocument
+from fastapi import (APIRouter, UploadFile, File, HTTPException, Depends, Form, Query, Request,
+                     WebSocket, WebSocketDisconnect, status)
+from fastapi.responses import StreamingResponse, Response
 from app.routes.auth import get_current_user
-from app.database.mongodb import live_sessions_collection, judge_questions_collection, cases_collection
-from rag.moot_rag.audio.stt import speech_to_text
-from rag.moot_rag.audio.tts import text_to_speech, tts_to_bytes
-from rag.moot_rag.run_rag import run_opponent_rag, run_judge_reply
-from eval_rag.evaluator.rubric import RUBRIC_TEXT
-from eval_rag.api.main import call_llm
+from app.database.mongodb import live_sessions_collection
+from app.services.stage_graph import StageGraph
+from app.services.deadlines import TurnBudget, run_stage, stage_metrics
+from app.services.thread_stream import iterate_in_thread
+from app.services.singleflight import SingleFlight
+from app.services.reference_cache import judge_question_banks, case_metadata
+from app.services.session_store import get_session_state, get_session_history, number_turns, flush_pending
+from app.services.user_stats import record_evaluation
+from app.services.eval_jobs import evaluation_jobs, EvaluationQueueFull, job_view
+from app.services.transcode import (
+    transcode_upload, TranscodeError, TranscoderBusy, AudioTooLarge, PCMStream, Transcoded, UPLOAD_MAX_BYTES
+)
+from app.services.stream_stt import StreamingRecognizer
+from app.services.stt_pool import stt_pool, STTOverloaded, STTTimeout, STTUnavailable
+from rag.moot_rag.audio.vad import detect_speech, vad_stats, VAD_ENABLED
+from app.services.audio_store import save_audio, open_audio, audio_owned, audio_owner, audio_url, parse_range
+from app.services.audio_render import (
+    AUDIO_RENDER_MODES, AUDIO_RENDER_DEFAULT, AUDIO_RENDER_TIMEOUT_S,
+    schedule_render, render, has_render_job
+)
+from rag.moot_rag.audio.tts import synthesize, get_engine
+from rag.moot_rag.audio.tts_stream import SentenceSegmenter, pipelined_tts
+from rag.moot_rag.run_rag import run_opponent_rag, stream_opponent_rag, run_judge_reply
+from eval_rag.evaluator.rubric import RUBRIC_TEXT, RUBRIC_CATEGORIES, RUBRIC_VERSION
+from eval_rag.evaluator.stream_parser import ScoreStreamParser
+from eval_rag.api.main import call_llm, stream_llm, EVAL_MODEL, EVAL_LLM_TIMEOUT_S
 from eval_rag.evaluator.prompt_builder import build_prompt
 from eval_rag.retrieval.retriever import retrieve_context
 
@@ -26,6 +47,15 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 router = APIRouter(prefix="/moot", tags=["Moot"])
+evaluation_flights = SingleFlight()
+
+TTS_STREAM_PARALLELISM = int(os.getenv("TTS_STREAM_PARALLELISM", "3"))
+AUDIO_READ_CHUNK = 256 * 1024
+EVAL_EVENTS_POLL_S = float(os.getenv("EVAL_EVENTS_POLL_S", "2"))
+STREAM_IDLE_TIMEOUT_S = float(os.getenv("STREAM_IDLE_TIMEOUT_S", "30"))
+# Browser origins allowed by CORS and on the live-audio WebSocket
+ALLOWED_ORIGINS = [origin.strip() for origin in
+                   os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",") if origin.strip()]
 
 
 # ================= MODELS =================
@@ -38,91 +68,186 @@ class ArgumentRequest(BaseModel):
 
 
 # ================= HELPERS =================
-async def get_session_by_id(session_id: str, user_id):
-    session = await live_sessions_collection.find_one({
-        "_id": ObjectId(session_id),
-        "user_id": user_id
-    })
-    if not session:
-        raise HTTPException(404, "Session not found")
-    return session
-
-
-async def push_history(session_id: str, user_id, role: str, text: str,
-                       type: Optional[str] = None, audio_b64: Optional[str] = None):
+def history_entry(role: str, text: str, type: Optional[str] = None,
+                  audio: Optional[dict] = None) -> dict:
     entry = {"role": role, "text": text, "timestamp": datetime.utcnow()}
     if type:
         entry["type"] = type
-    if audio_b64:
-        entry["audio"] = audio_b64
-    result = await live_sessions_collection.update_one(
-        {"_id": ObjectId(session_id), "user_id": user_id},
-        {"$push": {"history": entry}}
-    )
-    if result.modified_count == 0:
-        raise HTTPException(500, "Failed to push history")
-
-
-async def set_turn(session_id: str, turn: str, party: Optional[str]):
-    await live_sessions_collection.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$set": {
-            "next_turn": turn,
+    if audio:
+        # Only the reference — the bytes live in GridFS (see audio_store)
+        entry.update(audio)
+    return entry
+
+
+def expect_turn(session: dict, turn: str):
+    """Cheap early check, before any STT/LLM work; advance_turn re-checks atomically."""
+    if session.get("next_turn") != turn:
+        raise HTTPException(409, f"Session is at {session.get('next_turn')}, not {turn}")
+
+
+async def advance_turn(session_id: str, user_id, expected_turn: str, turn_count: Optional[int],
+                       next_turn: str, party: Optional[str], entries: list,
+                       fields: Optional[dict] = None) -> dict:
+    """
+    The new state, updated_at, the turn numbers and the numbered entries
+    (as pending_turns) land in a single find_one_and_update, conditional
+    on the session still being at expected_turn with the turn_count the
+    caller loaded (None for sessions that predate it). Of two racing submits only one matches; the other gets a 409 and
+    writes nothing. The winner's entries are then flushed to the transcript
+    buckets; if that fails they stay pending in the session and the next
+    history read flushes them, so the turn is recorded either way.
+    """
+    numbered = number_turns(turn_count or 0, entries)
+    update = {
+        "$set": {
+            **(fields or {}),
+            "next_turn": next_turn,
             "current_party": party,
             "updated_at": datetime.utcnow()
-        }}
+        },
+        "$inc": {"turn_count": len(entries)},
+    }
+    if numbered:
+        update["$push"] = {"pending_turns": {"$each": numbered}}
+    state = await live_sessions_collection.find_one_and_update(
+        {"_id": ObjectId(session_id), "user_id": user_id, "next_turn": expected_turn, "turn_count": turn_count},
+        update,
+        projection={"next_turn": 1, "current_party": 1, "turn_count": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if state is None:
+        raise HTTPException(409, f"Session is no longer at {expected_turn}")
+    if numbered:
+        try:
+            await flush_pending(state["_id"], numbered)
+        except Exception as e:
+            logger.warning(f"Transcript flush for {session_id} deferred: {e}")
+    return state
 
 
 async def get_judge_question(case_type: str):
-    q = await judge_questions_collection.find_one({"case_type": case_type.lower()})
+    q = await judge_question_banks.get(case_type)
     if not q or not q.get("questions"):
         return None
     return random.choice(q["questions"])
 
 
 # ================= TTS HELPER =================
-async def generate_audio_b64(text: str, voice: str = "default") -> Optional[str]:
+async def generate_audio(text: str, voice: str = "default",
+                         budget: Optional[TurnBudget] = None) -> Optional[bytes]:
+    """TTS under the turn budget — falls back to a text-only reply (None) on timeout or error."""
     if not text or not text.strip():
         return None
+    timeout = (budget or TurnBudget()).timeout("tts")
     try:
-        audio_bytes = await asyncio.to_thread(text_to_speech, text, voice)
-        return base64.b64encode(audio_bytes).decode()
+        return await run_stage(
+            "tts",
+            lambda: synthesize(text, voice, timeout),
+            timeout,
+            fallback=None
+        )
     except Exception as e:
         logger.warning(f"TTS failed for voice={voice}: {e}")
         return None
 
 
+async def store_audio(audio_bytes: Optional[bytes], mime: str,
+                      duration: Optional[float] = None, owner: Optional[dict] = None) -> Optional[dict]:
+    """Persist a clip; a storage failure degrades to a text-only turn."""
+    if not audio_bytes:
+        return None
+    try:
+        return await save_audio(audio_bytes, mime, duration, owner=owner)
+    except Exception as e:
+        logger.warning(f"Audio store failed ({len(audio_bytes)} bytes): {e}")
+        return None
+
+
+async def generate_audio_ref(text: str, voice: str = "default",
+                             budget: Optional[TurnBudget] = None,
+                             render_mode: str = "eager", owner: Optional[dict] = None) -> Optional[dict]:
+    """
+    eager      — synthesize now, the turn waits for it
+    background — return a render id at once, synthesize in a background task
+    lazy       — return a render id at once, synthesize on first fetch
+
+    owner (audio_owner) is who may fetch the clip.
+    """
+    if render_mode != "eager":
+        try:
+            return await schedule_render(text, voice, background=render_mode == "background", owner=owner)
+        except Exception as e:
+            logger.warning(f"Scheduling render failed for voice={voice}: {e}")
+            return None
+    audio_bytes = await generate_audio(text, voice, budget)
+    return await store_audio(audio_bytes, get_engine().mime, owner=owner)
+
+
+def check_render_mode(audio_render: str) -> str:
+    if audio_render not in AUDIO_RENDER_MODES:
+        raise HTTPException(400, f"audio_render must be one of {', '.join(AUDIO_RENDER_MODES)}")
+    return audio_render
+
+
 # ================= AUDIO UTILITY =================
-async def process_audio(file: UploadFile) -> str:
-    webm_bytes = await file.read()
-    if not webm_bytes:
-        return ""
-
-    ffmpeg_cmd = [
-        "ffmpeg", "-y",
-        "-i", "pipe:0",
-        "-ac", "1",
-        "-ar", "16000",
-        "-f", "wav",
-        "pipe:1"
-    ]
+class PetitionerAudio(BaseModel):
+    """The petitioner's own recording, kept as uploaded (webm/opus is already compact)."""
+    text: str = ""
+    audio: bytes = b""
+    mime: str = "audio/webm"
+    duration: Optional[float] = None
+
+    async def store(self, owner: Optional[dict] = None) -> Optional[dict]:
+        return await store_audio(self.audio, self.mime, self.duration, owner)
+
+
+async def process_audio(file: UploadFile) -> PetitionerAudio:
+    mime = file.content_type or "audio/webm"
+    try:
+        transcoded = await transcode_upload(file)
+    except TranscoderBusy as e:
+        raise HTTPException(
+            503,
+            {"message": "Audio processing is busy, please retry.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except AudioTooLarge as e:
+        raise HTTPException(413, str(e))
+    except TranscodeError as e:
+        logger.error(f"ffmpeg error: {e}")
+        return PetitionerAudio(audio=e.source, mime=mime)
+
+    recording = PetitionerAudio(audio=transcoded.source, mime=mime, duration=transcoded.duration)
+    if not transcoded.pcm:
+        return recording
+
+    segments = [transcoded.pcm]
+    if VAD_ENABLED:
+        vad = await asyncio.to_thread(detect_speech, transcoded.pcm)
+        vad_stats.record(vad)
+        logger.info(f"VAD: {vad.total_s:.1f}s -> {vad.speech_s:.1f}s speech in "
+                    f"{len(vad.segments)} segments ({vad.removed_s:.1f}s removed)")
+        if not vad.has_speech:
+            return recording  # no speech: skip Whisper entirely
+        segments = vad.segments
 
     try:
-        process = subprocess.run(
-            ffmpeg_cmd,
-            input=webm_bytes,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True
+        text = await stt_pool.transcribe(*segments)
+    except STTOverloaded as e:
+        raise HTTPException(
+            429,
+            {"message": "Transcription is busy, please retry.",
+             "queue_position": e.position, "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
         )
-        wav_stream = io.BytesIO(process.stdout)
-        wav_stream.seek(0)
-        text = await asyncio.to_thread(speech_to_text, wav_stream)
-        return text.strip() if text else ""
-    except subprocess.CalledProcessError as e:
-        logger.error(f"ffmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
-        return ""
+    except STTTimeout as e:
+        logger.error(f"STT timeout: {e}")
+        raise HTTPException(504, "Transcription timed out")
+    except STTUnavailable as e:
+        logger.error(f"STT unavailable: {e}")
+        raise HTTPException(503, "Transcription is temporarily unavailable")
+    recording.text = text.strip() if text else ""
+    return recording
 
 
 # ================= SSE HELPER =================
@@ -134,22 +259,16 @@ def sse_event(event: str, data: dict) -> str:
 @router.post("/initiate")
 async def initiate(req: SessionRequest, current_user=Depends(get_current_user)):
 
-    # ✅ FIX: Fetch case summary + moot problem at session start
-    case_doc = await cases_collection.find_one({"id": req.case_id})
-    case_summary = ""
-    if case_doc:
-        case_summary = case_doc.get("content", "")
-        # Trim to avoid bloating every request — first 2000 chars is enough context
-        if len(case_summary) > 2000:
-            case_summary = case_summary[:2000] + "...[truncated]"
+    # ✅ FIX: Fetch case summary + moot problem at session start (cached, already trimmed)
+    case_meta = await case_metadata.get(req.case_id) or {"title": "", "summary": ""}
 
     session = {
         "user_id": current_user["_id"],
         "case_id": req.case_id,
         "case_type": req.case_type,
-        "case_title": case_doc.get("title", "") if case_doc else "",
-        "case_summary": case_summary,           # ✅ stored in session
-        "history": [],
+        "case_title": case_meta["title"],
+        "case_summary": case_meta["summary"],   # ✅ stored in session
+        "turn_count": 0,                        # transcript lives in session_turns
         "evaluation_history": [],
         "original_petitioner_argument": None,
         "next_turn": "PETITIONER_ARGUMENT",
@@ -162,33 +281,168 @@ async def initiate(req: SessionRequest, current_user=Depends(get_current_user)):
 
 
 @router.get("/transcript")
-async def transcript(session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
-    return session.get("history", [])
+async def transcript(session_id: str, last: Optional[int] = Query(None, ge=1),
+                     current_user=Depends(get_current_user)):
+    # Sessions from before GridFS still carry their clips inline
+    session = await get_session_history(session_id, current_user["_id"], last=last, inline_audio=True)
+    history = session.get("history", [])
+    for h in history:
+        if h.get("audio_id"):
+            h["audio_url"] = audio_url(h)
+        if h.get("audio_parts"):
+            # chunked respondent turns: one clip per sentence, in order
+            h["audio_urls"] = [audio_url(part) for part in h["audio_parts"]]
+    return history
+
+
+# ================= AUDIO =================
+@router.get("/audio/{audio_id}")
+async def get_audio(audio_id: str, request: Request, current_user=Depends(get_current_user)):
+    """
+    Stream a stored clip. A clip never changes once stored, so the ETag is
+    the id and the response is cacheable forever. Single byte ranges are
+    honoured so players can seek without downloading it all. Deferred clips
+    are rendered on their first fetch. Only the clip's owners may fetch it;
+    anyone else gets the same 404 as for an unknown id.
+    """
+    user_id = current_user["_id"]
+    if not await audio_owned(audio_id, user_id) and not await has_render_job(audio_id, user_id):
+        raise HTTPException(404, "Audio not found")
+    grid_out = await open_audio(audio_id)
+    if grid_out is None:
+        # Deferred clip (lazy / background mode): render it now, once
+        try:
+            rendered = await asyncio.wait_for(render(audio_id), AUDIO_RENDER_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            rendered = False
+        grid_out = await open_audio(audio_id) if rendered else None
+        if grid_out is None:
+            raise HTTPException(503, "Audio could not be rendered")
+
+    etag = f'"{audio_id}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    size = grid_out.length
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    async def body():
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(AUDIO_READ_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    mime = (grid_out.metadata or {}).get("mime", "application/octet-stream")
+    return StreamingResponse(body(), status_code=status_code, media_type=mime, headers=headers)
 
 
 # ================= PETITIONER ARGUMENT (TEXT) =================
 @router.post("/petitioner/argument")
 async def petitioner_argument(req: ArgumentRequest, session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_ARGUMENT")
 
     text = req.text or ""
-    await live_sessions_collection.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$set": {"original_petitioner_argument": text}}
-    )
-    await push_history(session_id, current_user["_id"], "petitioner", text, type="argument")
-
+    entries = [history_entry("petitioner", text, type="argument")]
     judge_q = await get_judge_question(session["case_type"])
     if judge_q:
-        await push_history(session_id, current_user["_id"], "judge", judge_q)
+        entries.append(history_entry("judge", judge_q))
 
-    await set_turn(session_id, "PETITIONER_REPLY_TO_JUDGE" if judge_q else "RESPONDENT_RAG", "PETITIONER")
+    next_turn = "PETITIONER_REPLY_TO_JUDGE" if judge_q else "RESPONDENT_RAG"
+    await advance_turn(session_id, current_user["_id"], "PETITIONER_ARGUMENT", session.get("turn_count"),
+                       next_turn, "PETITIONER", entries, {"original_petitioner_argument": text})
     return {
         "judge_question": judge_q,
-        "next_turn": "PETITIONER_REPLY_TO_JUDGE" if judge_q else "RESPONDENT_RAG"
+        "next_turn": next_turn
+    }
+
+
+# ================= PETITIONER AUDIO TURNS =================
+PETITIONER_TURN_KINDS = {
+    "PETITIONER_ARGUMENT": "argument",
+    "PETITIONER_REPLY_TO_JUDGE": "reply_to_judge",
+    "PETITIONER_REBUTTAL": "rebuttal",
+}
+PETITIONER_TURNS = {kind: turn for turn, kind in PETITIONER_TURN_KINDS.items()}
+
+
+async def complete_petitioner_audio_turn(session: dict, user_id, kind: str,
+                                         recording: PetitionerAudio,
+                                         audio_render: str = AUDIO_RENDER_DEFAULT) -> dict:
+    """Record a transcribed petitioner turn and advance the session (upload and live paths)."""
+    session_id = str(session["_id"])
+    expected_turn = PETITIONER_TURNS[kind]
+    text = recording.text
+    owner = audio_owner(user_id, session_id)
+
+    if kind == "argument":
+        if not text:
+            return {
+                "transcribed_text": "",
+                "message": "Could not detect speech. Please speak again.",
+                "judge_question": None,
+                "judge_audio_url": None,
+                "next_turn": session.get("next_turn", "PETITIONER_ARGUMENT")
+            }
+
+        entries = [history_entry("petitioner", text, type="argument", audio=await recording.store(owner))]
+
+        judge_q = await get_judge_question(session["case_type"])
+        judge_audio = None
+        if judge_q:
+            judge_audio = await generate_audio_ref(judge_q, "judge", render_mode=audio_render, owner=owner)
+            entries.append(history_entry("judge", judge_q, audio=judge_audio))
+
+        next_turn = "PETITIONER_REPLY_TO_JUDGE" if judge_q else "RESPONDENT_RAG"
+        await advance_turn(session_id, user_id, expected_turn, session.get("turn_count"),
+                           next_turn, "PETITIONER", entries, {"original_petitioner_argument": text})
+
+        return {
+            "transcribed_text": text,
+            "judge_question": judge_q,
+            "judge_audio_url": audio_url(judge_audio),
+            "next_turn": next_turn
+        }
+
+    if kind == "reply_to_judge":
+        if not text:
+            return {"transcribed_text": "", "message": "Could not detect speech.",
+                    "next_turn": session.get("next_turn")}
+
+        entry = history_entry("petitioner", text, type="reply_to_judge", audio=await recording.store(owner))
+        await advance_turn(session_id, user_id, expected_turn, session.get("turn_count"),
+                           "RESPONDENT_RAG", "RESPONDENT", [entry])
+        return {"transcribed_text": text, "next_turn": "RESPONDENT_RAG"}
+
+    petitioner_audio = await recording.store(owner)
+    entry = history_entry("petitioner", text, type="rebuttal", audio=petitioner_audio)
+    await advance_turn(session_id, user_id, expected_turn, session.get("turn_count"),
+                       "SESSION_END", None, [entry])
+    return {
+        "transcribed_text": text,
+        "petitioner_audio_url": audio_url(petitioner_audio),
+        "petitioner_audio_mime": recording.mime,
+        "next_turn": "SESSION_END"
     }
 
 
@@ -197,59 +451,31 @@ async def petitioner_argument(req: ArgumentRequest, session_id: str, current_use
 async def petitioner_argument_audio(
     session_id: str = Form(...),
     file: UploadFile = File(...),
+    audio_render: str = AUDIO_RENDER_DEFAULT,
     current_user=Depends(get_current_user)
 ):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    check_render_mode(audio_render)
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_ARGUMENT")
 
-    text = await process_audio(file)
-    if not text:
-        return {
-            "transcribed_text": "",
-            "message": "Could not detect speech. Please speak again.",
-            "judge_question": None,
-            "judge_audio": None,
-            "next_turn": session.get("next_turn", "PETITIONER_ARGUMENT")
-        }
-
-    await live_sessions_collection.update_one(
-        {"_id": ObjectId(session_id)},
-        {"$set": {"original_petitioner_argument": text}}
-    )
-
-    petitioner_audio_b64 = await generate_audio_b64(text, "petitioner")
-    await push_history(session_id, current_user["_id"], "petitioner", text,
-                       type="argument", audio_b64=petitioner_audio_b64)
-
-    judge_q = await get_judge_question(session["case_type"])
-    judge_audio_b64 = None
-    if judge_q:
-        judge_audio_b64 = await generate_audio_b64(judge_q, "judge")
-        await push_history(session_id, current_user["_id"], "judge", judge_q,
-                           audio_b64=judge_audio_b64)
-
-    next_turn = "PETITIONER_REPLY_TO_JUDGE" if judge_q else "RESPONDENT_RAG"
-    await set_turn(session_id, next_turn, "PETITIONER")
-
-    return {
-        "transcribed_text": text,
-        "judge_question": judge_q,
-        "judge_audio": judge_audio_b64,
-        "next_turn": next_turn
-    }
+    recording = await process_audio(file)
+    return await complete_petitioner_audio_turn(session, current_user["_id"], "argument",
+                                                recording, audio_render)
 
 
 # ================= PETITIONER REPLY TO JUDGE (TEXT) =================
 @router.post("/petitioner/reply")
 async def petitioner_reply(req: ArgumentRequest, session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_REPLY_TO_JUDGE")
 
     text = req.text or ""
-    await push_history(session_id, current_user["_id"], "petitioner", text, type="reply_to_judge")
-    await set_turn(session_id, "RESPONDENT_RAG", "RESPONDENT")
+    await advance_turn(session_id, current_user["_id"], "PETITIONER_REPLY_TO_JUDGE", session.get("turn_count"),
+                       "RESPONDENT_RAG", "RESPONDENT", [history_entry("petitioner", text, type="reply_to_judge")])
     return {"next_turn": "RESPONDENT_RAG"}
 
 
@@ -260,32 +486,26 @@ async def petitioner_reply_audio(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
 ):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_REPLY_TO_JUDGE")
 
-    text = await process_audio(file)
-    if not text:
-        return {"transcribed_text": "", "message": "Could not detect speech.",
-                "next_turn": session.get("next_turn")}
-
-    petitioner_audio_b64 = await generate_audio_b64(text, "petitioner")
-    await push_history(session_id, current_user["_id"], "petitioner", text,
-                       type="reply_to_judge", audio_b64=petitioner_audio_b64)
-    await set_turn(session_id, "RESPONDENT_RAG", "RESPONDENT")
-    return {"transcribed_text": text, "next_turn": "RESPONDENT_RAG"}
+    recording = await process_audio(file)
+    return await complete_petitioner_audio_turn(session, current_user["_id"], "reply_to_judge", recording)
 
 
 # ================= PETITIONER REBUTTAL (TEXT) =================
 @router.post("/petitioner/rebut")
 async def petitioner_rebut(req: ArgumentRequest, session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_REBUTTAL")
 
     text = req.text or ""
-    await push_history(session_id, current_user["_id"], "petitioner", text, type="rebuttal")
-    await set_turn(session_id, "SESSION_END", None)
+    await advance_turn(session_id, current_user["_id"], "PETITIONER_REBUTTAL", session.get("turn_count"),
+                       "SESSION_END", None, [history_entry("petitioner", text, type="rebuttal")])
     return {"next_turn": "SESSION_END"}
 
 
@@ -296,112 +516,388 @@ async def petitioner_rebut_audio(
     file: UploadFile = File(...),
     current_user=Depends(get_current_user)
 ):
-    session = await get_session_by_id(session_id, current_user["_id"])
+    session = await get_session_state(session_id, current_user["_id"])
     if session["current_party"] != "PETITIONER":
         raise HTTPException(400, "Not petitioner's turn")
+    expect_turn(session, "PETITIONER_REBUTTAL")
+
+    recording = await process_audio(file)
+    return await complete_petitioner_audio_turn(session, current_user["_id"], "rebuttal", recording)
+
+
+# ================= PETITIONER LIVE AUDIO (WEBSOCKET) =================
+async def websocket_user(websocket: WebSocket):
+    """Cookie auth for WebSockets; closes the socket and returns None on failure."""
+    try:
+        return await get_current_user(
+            authorization=websocket.headers.get("authorization"),
+            access_token=websocket.cookies.get("access_token"),
+            session_cookie=websocket.cookies.get("session_cookie")
+        )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return None
+
+
+def origin_allowed(websocket: WebSocket) -> bool:
+    """
+    WebSockets bypass CORS, so a page on any site could open one with the
+    user's cookies. Browsers always send Origin; clients that aren't
+    browsers may omit it.
+    """
+    origin = websocket.headers.get("origin")
+    return origin is None or origin in ALLOWED_ORIGINS
+
+
+async def close_with_error(websocket: WebSocket, message: str, code: int):
+    try:
+        await websocket.send_json({"type": "error", "message": message})
+        await websocket.close(code=code)
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # the client is already gone
+
+
+def _control_type(text: str) -> Optional[str]:
+    try:
+        return json.loads(text).get("type")
+    except (ValueError, AttributeError):
+        return None
+
+
+@router.websocket("/petitioner/stream")
+async def petitioner_stream(websocket: WebSocket, session_id: str, format: str = "webm",
+                            audio_render: str = AUDIO_RENDER_DEFAULT):
+    """
+    Live petitioner turn. The turn (argument / reply / rebuttal) follows
+    the session's next_turn.
+
+    Client -> server: binary frames of audio while recording —
+                      format=webm: MediaRecorder chunks,
+                      format=pcm:  raw 16 kHz mono s16le —
+                      then {"type": "stop"} as text.
+    Server -> client: {"type": "partial", "seq", "text", "transcript"} per
+                      decoded speech window, {"type": "final", "text",
+                      "finalize_ms"} after stop, then {"type": "turn", ...}
+                      with the same body the upload endpoint returns.
+                      {"type": "error", "message"} before any abnormal close.
+
+    The socket is closed when no frame arrives for STREAM_IDLE_TIMEOUT_S.
+    """
+    if not origin_allowed(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    current_user = await websocket_user(websocket)
+    if current_user is None:
+        return
+    try:
+        session = await get_session_state(session_id, current_user["_id"])
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    kind = PETITIONER_TURN_KINDS.get(session.get("next_turn"))
+    if (session["current_party"] != "PETITIONER" or kind is None
+            or format not in ("webm", "pcm") or audio_render not in AUDIO_RENDER_MODES):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def send_partial(seq: int, text: str, transcript: str):
+        await websocket.send_json({"type": "partial", "seq": seq, "text": text, "transcript": transcript})
+
+    recognizer = StreamingRecognizer(send_partial).start()
+    source = bytearray()
+    transcoder = None
+    try:
+        if format == "webm":
+            transcoder = PCMStream(recognizer.add_pcm)
+            await transcoder.start()
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), STREAM_IDLE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                await close_with_error(websocket, f"No audio received for {STREAM_IDLE_TIMEOUT_S:.0f}s.",
+                                       status.WS_1008_POLICY_VIOLATION)
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                chunk = message["bytes"]
+                source.extend(chunk)
+                if len(source) > UPLOAD_MAX_BYTES:
+                    raise AudioTooLarge("Recording is too large")
+                if transcoder:
+                    await transcoder.write(chunk)
+                else:
+                    recognizer.add_pcm(chunk)
+            elif message.get("text") and _control_type(message["text"]) == "stop":
+                break
+
+        stopped = time.perf_counter()
+        if transcoder:
+            await transcoder.close()
+        text = await recognizer.finish()
+        finalize_ms = round((time.perf_counter() - stopped) * 1000)
+        logger.info(f"Live STT {session_id}: {len(recognizer.pcm) / 32000:.1f}s audio, "
+                    f"finalized {finalize_ms} ms after stop")
+        await websocket.send_json({"type": "final", "text": text, "finalize_ms": finalize_ms})
+
+        if transcoder:
+            recording = PetitionerAudio(audio=bytes(source), mime="audio/webm")
+        else:
+            recording = PetitionerAudio(audio=Transcoded(b"", bytes(recognizer.pcm)).wav().getvalue(),
+                                        mime="audio/wav")
+        recording.text = text
+        recording.duration = round(len(recognizer.pcm) / 32000, 2)
+        result = await complete_petitioner_audio_turn(session, current_user["_id"], kind,
+                                                      recording, audio_render)
+        await websocket.send_json({"type": "turn", **result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except AudioTooLarge as e:
+        await close_with_error(websocket, str(e), status.WS_1009_MESSAGE_TOO_BIG)
+    except TranscoderBusy as e:
+        await close_with_error(websocket, str(e), status.WS_1013_TRY_AGAIN_LATER)
+    except (TranscodeError, STTOverloaded, STTTimeout, STTUnavailable) as e:
+        logger.error(f"Live STT {session_id} failed: {e}")
+        await close_with_error(websocket, "Transcription failed.", status.WS_1011_INTERNAL_ERROR)
+    except HTTPException as e:
+        # complete_petitioner_audio_turn: the turn moved on meanwhile (409)
+        await close_with_error(websocket, str(e.detail), status.WS_1008_POLICY_VIOLATION)
+    except Exception as e:
+        # e.g. RuntimeError from the decoder task or a send on a closing socket
+        logger.exception(f"Live STT {session_id} failed: {e}")
+        await close_with_error(websocket, "Transcription failed.", status.WS_1011_INTERNAL_ERROR)
+    finally:
+        recognizer.cancel()
+        if transcoder:
+            await transcoder.reap()
+
+
+# ================= RESPONDENT TURN GRAPH =================
+def _response_text(rag_response) -> str:
+    return rag_response.get("response") if isinstance(rag_response, dict) else str(rag_response)
+
 
-    text = await process_audio(file)
-    petitioner_audio_b64 = await generate_audio_b64(text, "petitioner")
-    await push_history(session_id, current_user["_id"], "petitioner", text,
-                       type="rebuttal", audio_b64=petitioner_audio_b64)
-    await set_turn(session_id, "SESSION_END", None)
+def respondent_rag_kwargs(session: dict) -> dict:
     return {
-        "transcribed_text": text,
-        "petitioner_audio": petitioner_audio_b64,
-        "next_turn": "SESSION_END"
+        "case_key": session["case_id"],
+        "argument": session.get("original_petitioner_argument", ""),
+        "history": session.get("history", []),
+        "case_type": session.get("case_type"),
+        "case_summary": session.get("case_summary", ""),
+        "case_title": session.get("case_title", ""),
     }
 
 
+def build_respondent_graph(session: dict, budget: Optional[TurnBudget] = None,
+                           stream_argument: bool = False,
+                           render_mode: str = "eager",
+                           owner: Optional[dict] = None) -> StageGraph:
+    """
+    Respondent turn as a dependency graph:
+
+        respondent_argument ──> respondent_audio
+        judge_question ──┬──> judge_audio
+                         └──> respondent_reply ──> respondent_reply_audio
+
+    run_judge_reply only retrieves on the judge question, so it no longer
+    waits for the respondent argument or a second session read.
+
+    Every stage runs under a share of one TurnBudget; the LLM stages raise
+    on timeout, the TTS stages fall back to no audio. With stream_argument
+    the caller produces the respondent argument itself (sentence-pipelined
+    TTS) and the graph only covers the judge branch. Outside eager
+    render_mode the audio stages only schedule a render and return at once.
+    Stored clips belong to owner (audio_owner).
+    """
+    case_id      = session["case_id"]
+    case_type    = session.get("case_type")
+    case_summary = session.get("case_summary", "")
+    history      = session.get("history", [])
+    budget       = budget or TurnBudget()
+
+    async def respondent_argument():
+        timeout = budget.timeout("respondent_rag")
+        rag_response = await run_stage("respondent_rag", lambda: asyncio.to_thread(
+            run_opponent_rag, **respondent_rag_kwargs(session), timeout=timeout
+        ), timeout)
+        return _response_text(rag_response)
+
+    async def respondent_reply(judge_question):
+        if not judge_question:
+            return None
+        # ✅ run_judge_reply — short 5-7 line response, NOT full RAG
+        timeout = budget.timeout("judge_reply")
+        reply_response = await run_stage("judge_reply", lambda: asyncio.to_thread(
+            run_judge_reply,
+            case_key=case_id,
+            judge_question=judge_question,
+            history=history,
+            case_type=case_type,
+            case_summary=case_summary,
+            timeout=timeout
+        ), timeout)
+        return _response_text(reply_response)
+
+    graph = StageGraph(f"respondent:{session['_id']}")
+    if not stream_argument:
+        graph.add("respondent_argument", respondent_argument)
+        graph.add("respondent_audio",
+                  lambda respondent_argument: generate_audio_ref(respondent_argument, "respondent", budget, render_mode, owner),
+                  deps=["respondent_argument"])
+    return (
+        graph
+        .add("judge_question",
+             lambda: run_stage("judge_question", lambda: get_judge_question(case_type),
+                               budget.timeout("judge_question"), fallback=None))
+        .add("judge_audio",
+             lambda judge_question: generate_audio_ref(judge_question, "judge", budget, render_mode, owner),
+             deps=["judge_question"])
+        .add("respondent_reply", respondent_reply, deps=["judge_question"])
+        .add("respondent_reply_audio",
+             lambda respondent_reply: generate_audio_ref(respondent_reply, "respondent", budget, render_mode, owner),
+             deps=["respondent_reply"])
+    )
+
+
 # ================= RESPONDENT RAG (SSE STREAMING) =================
 @router.get("/respondent/rag/stream")
-async def respondent_rag_stream(session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
+async def respondent_rag_stream(session_id: str, audio_mode: str = "full",
+                                audio_render: str = AUDIO_RENDER_DEFAULT,
+                                current_user=Depends(get_current_user)):
+    """
+    audio_mode=full    — one audio URL per event (default)
+    audio_mode=chunked — respondent argument audio arrives as ordered
+                         `audio_chunk` events, one per sentence, while the
+                         LLM is still writing (eager rendering only)
+    audio_render       — eager | background | lazy, see generate_audio_ref
+    """
+    check_render_mode(audio_render)
+    session = await get_session_history(session_id, current_user["_id"])
+    expect_turn(session, "RESPONDENT_RAG")
+    chunked = audio_mode == "chunked" and audio_render == "eager"
+    owner = audio_owner(current_user["_id"], session_id)
 
     async def event_generator():
-        original_arg  = session.get("original_petitioner_argument", "")
-        history       = session.get("history", [])
-        case_id       = session["case_id"]
-        case_type     = session.get("case_type")
-        case_summary  = session.get("case_summary", "")  # ✅ pulled from session
-        case_title    = session.get("case_title", "")
-
-        # ── STEP 1: Respondent main argument ─────────────────────────────
+        # All stages start now; results are consumed below in the same
+        # order the events were always emitted in.
+        budget = TurnBudget()
+        graph = build_respondent_graph(session, budget, stream_argument=chunked,
+                                       render_mode=audio_render, owner=owner).start()
         try:
-            rag_response = await asyncio.to_thread(
-                run_opponent_rag,
-                case_key=case_id,
-                argument=original_arg,
-                history=history,
-                case_type=case_type,
-                case_summary=case_summary,   # ✅ passed in
-                case_title=case_title
-            )
-            respondent_argument = (
-                rag_response.get("response")
-                if isinstance(rag_response, dict)
-                else str(rag_response)
-            )
-        except Exception as e:
-            logger.error(f"Respondent RAG failed: {e}")
-            yield sse_event("error", {"message": "Respondent RAG failed."})
-            return
+            # ── STEP 1: Respondent main argument ─────────────────────────
+            if chunked:
+                t0 = time.perf_counter()
+                first_audio_s = None
+                audio_parts = []
+                segmenter = SentenceSegmenter()
+                timeout = budget.timeout("respondent_rag")
+                # The whole streamed argument must land inside its budget share;
+                # closing this generator (client gone) also stops the producer thread
+                deltas = iterate_in_thread(
+                    lambda: stream_opponent_rag(**respondent_rag_kwargs(session), timeout=timeout),
+                    deadline=time.monotonic() + timeout
+                )
+                pipeline = pipelined_tts(
+                    segmenter.sentences(deltas),
+                    lambda text: generate_audio(text, "respondent", budget),
+                    max_parallel=TTS_STREAM_PARALLELISM,
+                )
+                try:
+                    async for seq, sentence, audio in pipeline:
+                        chunk_ref = None
+                        if audio:
+                            chunk_ref = await store_audio(audio, get_engine().mime, owner=owner)
+                            if chunk_ref:
+                                audio_parts.append(chunk_ref)
+                            if first_audio_s is None:
+                                first_audio_s = time.perf_counter() - t0
+                        yield sse_event("audio_chunk", {
+                            "seq": seq,
+                            "text": sentence,
+                            "audio_url": audio_url(chunk_ref),
+                        })
+                except asyncio.TimeoutError:
+                    stage_metrics.timeouts["respondent_rag"] += 1
+                    logger.error(f"Respondent RAG stream {session_id} exceeded {timeout:.1f}s")
+                    yield sse_event("error", {"message": "Respondent RAG timed out."})
+                    return
+                except Exception as e:
+                    logger.error(f"Respondent RAG failed: {e}")
+                    yield sse_event("error", {"message": "Respondent RAG failed."})
+                    return
+                finally:
+                    # Cancels the sentence producer, which stops the RAG thread
+                    await pipeline.aclose()
+
+                respondent_argument = segmenter.text.strip()
+                # The chunks are already stored — history points at them
+                # instead of storing the joined clip a second time
+                respondent_audio = {"audio_parts": audio_parts} if audio_parts else None
+                logger.info(
+                    f"Chunked TTS {session_id}: {len(audio_parts)} chunks, "
+                    f"{sum(part['audio_size'] for part in audio_parts)} bytes, "
+                    f"first audio after {first_audio_s if first_audio_s is not None else -1:.2f}s"
+                )
+            else:
+                try:
+                    respondent_argument = await graph.result("respondent_argument")
+                except Exception as e:
+                    logger.error(f"Respondent RAG failed: {e}")
+                    yield sse_event("error", {"message": "Respondent RAG failed."})
+                    return
+                respondent_audio = await graph.result("respondent_audio")
+
+            # Entries are written with the turn change in STEP 4 — a client
+            # that drops mid-stream leaves the turn open to retry
+            entries = [history_entry("respondent", respondent_argument, audio=respondent_audio)]
+
+            yield sse_event("respondent_argument", {
+                "text": respondent_argument,
+                # chunked clients already have the audio from audio_chunk events
+                "audio_url": None if chunked else audio_url(respondent_audio),
+            })
 
-        respondent_audio_b64 = await generate_audio_b64(respondent_argument, "respondent")
-        await push_history(session_id, current_user["_id"], "respondent",
-                           respondent_argument, audio_b64=respondent_audio_b64)
+            # ── STEP 2: Judge question ───────────────────────────────────
+            judge_q = await graph.result("judge_question")
 
-        yield sse_event("respondent_argument", {
-            "text": respondent_argument,
-            "audio": respondent_audio_b64,
-        })
+            if judge_q:
+                judge_audio = await graph.result("judge_audio")
+                entries.append(history_entry("judge", judge_q, audio=judge_audio))
 
-        # ── STEP 2: Judge question ────────────────────────────────────────
-        judge_q = await get_judge_question(case_type)
+                yield sse_event("judge_question", {
+                    "text": judge_q,
+                    "audio_url": audio_url(judge_audio),
+                })
 
-        if judge_q:
-            judge_audio_b64 = await generate_audio_b64(judge_q, "judge")
-            await push_history(session_id, current_user["_id"], "judge",
-                               judge_q, audio_b64=judge_audio_b64)
+                # ── STEP 3: Respondent replies to judge ──────────────────
+                try:
+                    respondent_reply = await graph.result("respondent_reply")
+                except Exception as e:
+                    logger.error(f"Respondent judge reply failed: {e}")
+                    yield sse_event("error", {"message": "Respondent reply failed."})
+                    return
 
-            yield sse_event("judge_question", {
-                "text": judge_q,
-                "audio": judge_audio_b64,
-            })
+                respondent_reply_audio = await graph.result("respondent_reply_audio")
+                entries.append(history_entry("respondent", respondent_reply, audio=respondent_reply_audio))
 
-            # ── STEP 3: Respondent replies to judge ───────────────────────
-            # ✅ FIX: Use run_judge_reply — short 5-7 line response, NOT full RAG
-            updated_session = await get_session_by_id(session_id, current_user["_id"])
+                yield sse_event("respondent_reply", {
+                    "text": respondent_reply,
+                    "audio_url": audio_url(respondent_reply_audio),
+                })
+
+            # ── STEP 4: Finalise turn ────────────────────────────────────
             try:
-                reply_response = await asyncio.to_thread(
-                    run_judge_reply,                         # ✅ separate function
-                    case_key=case_id,
-                    judge_question=judge_q,
-                    history=updated_session["history"],
-                    case_type=case_type,
-                    case_summary=case_summary
-                )
-                respondent_reply = (
-                    reply_response.get("response")
-                    if isinstance(reply_response, dict)
-                    else str(reply_response)
-                )
-            except Exception as e:
-                logger.error(f"Respondent judge reply failed: {e}")
-                yield sse_event("error", {"message": "Respondent reply failed."})
+                await advance_turn(session_id, current_user["_id"], "RESPONDENT_RAG", session.get("turn_count"),
+                                   "PETITIONER_REBUTTAL", "PETITIONER", entries)
+            except HTTPException as e:
+                yield sse_event("error", {"message": e.detail})
                 return
-
-            respondent_reply_audio_b64 = await generate_audio_b64(respondent_reply, "respondent")
-            await push_history(session_id, current_user["_id"], "respondent",
-                               respondent_reply, audio_b64=respondent_reply_audio_b64)
-
-            yield sse_event("respondent_reply", {
-                "text": respondent_reply,
-                "audio": respondent_reply_audio_b64,
-            })
-
-        # ── STEP 4: Finalise turn ─────────────────────────────────────────
-        await set_turn(session_id, "PETITIONER_REBUTTAL", "PETITIONER")
-        yield sse_event("done", {"next_turn": "PETITIONER_REBUTTAL"})
+            yield sse_event("done", {"next_turn": "PETITIONER_REBUTTAL"})
+        finally:
+            graph.cancel()
+            logger.info(f"Respondent turn {session_id} took {graph.elapsed():.2f}s stages={graph.timings}")
 
     return StreamingResponse(
         event_generator(),
@@ -415,84 +911,50 @@ async def respondent_rag_stream(session_id: str, current_user=Depends(get_curren
 
 # ── Non-streaming fallback ──────────────────────────────────────────────────
 @router.post("/respondent/rag")
-async def respondent_rag(session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
-    original_arg  = session.get("original_petitioner_argument", "")
-    history       = session.get("history", [])
-    case_summary  = session.get("case_summary", "")
-    case_title    = session.get("case_title", "")
-
-    rag_task   = asyncio.to_thread(
-        run_opponent_rag,
-        case_key=session["case_id"],
-        argument=original_arg,
-        history=history,
-        case_type=session.get("case_type"),
-        case_summary=case_summary,
-        case_title=case_title
-    )
-    judge_task = get_judge_question(session["case_type"])
-    rag_response, judge_q = await asyncio.gather(rag_task, judge_task)
-
-    respondent_argument = (
-        rag_response.get("response") if isinstance(rag_response, dict) else str(rag_response)
-    )
+async def respondent_rag(session_id: str, audio_render: str = AUDIO_RENDER_DEFAULT,
+                         current_user=Depends(get_current_user)):
+    check_render_mode(audio_render)
+    session = await get_session_history(session_id, current_user["_id"])
+    expect_turn(session, "RESPONDENT_RAG")
+    graph = build_respondent_graph(session, render_mode=audio_render,
+                                   owner=audio_owner(current_user["_id"], session_id)).start()
+    try:
+        respondent_argument = await graph.result("respondent_argument")
+        respondent_audio    = await graph.result("respondent_audio")
+        entries = [history_entry("respondent", respondent_argument, audio=respondent_audio)]
 
-    async def _maybe_tts(text, voice):
-        return await generate_audio_b64(text, voice) if text else None
+        judge_q = await graph.result("judge_question")
+        judge_audio = None
+        respondent_reply = None
+        respondent_reply_audio = None
 
-    respondent_audio_b64, judge_audio_b64 = await asyncio.gather(
-        _maybe_tts(respondent_argument, "respondent"),
-        _maybe_tts(judge_q, "judge"),
-    )
+        if judge_q:
+            judge_audio = await graph.result("judge_audio")
+            entries.append(history_entry("judge", judge_q, audio=judge_audio))
 
-    await push_history(session_id, current_user["_id"], "respondent",
-                       respondent_argument, audio_b64=respondent_audio_b64)
+            respondent_reply       = await graph.result("respondent_reply")
+            respondent_reply_audio = await graph.result("respondent_reply_audio")
+            entries.append(history_entry("respondent", respondent_reply, audio=respondent_reply_audio))
+    finally:
+        graph.cancel()
+        logger.info(f"Respondent turn {session_id} took {graph.elapsed():.2f}s stages={graph.timings}")
 
-    respondent_reply = None
-    respondent_reply_audio_b64 = None
-
-    if judge_q:
-        await push_history(session_id, current_user["_id"], "judge", judge_q,
-                           audio_b64=judge_audio_b64)
-        updated_session = await get_session_by_id(session_id, current_user["_id"])
-
-        # ✅ FIX: Use run_judge_reply for short focused response
-        reply_response = await asyncio.to_thread(
-            run_judge_reply,
-            case_key=session["case_id"],
-            judge_question=judge_q,
-            history=updated_session["history"],
-            case_type=session.get("case_type"),
-            case_summary=case_summary
-        )
-        respondent_reply = (
-            reply_response.get("response") if isinstance(reply_response, dict) else str(reply_response)
-        )
-        respondent_reply_audio_b64 = await generate_audio_b64(respondent_reply, "respondent")
-        await push_history(session_id, current_user["_id"], "respondent",
-                           respondent_reply, audio_b64=respondent_reply_audio_b64)
-
-    await set_turn(session_id, "PETITIONER_REBUTTAL", "PETITIONER")
+    await advance_turn(session_id, current_user["_id"], "RESPONDENT_RAG", session.get("turn_count"),
+                       "PETITIONER_REBUTTAL", "PETITIONER", entries)
 
     return {
         "respondent_argument": respondent_argument,
-        "respondent_audio": respondent_audio_b64,
+        "respondent_audio_url": audio_url(respondent_audio),
         "judge_question": judge_q,
-        "judge_audio": judge_audio_b64,
+        "judge_audio_url": audio_url(judge_audio),
         "respondent_reply": respondent_reply,
-        "respondent_reply_audio": respondent_reply_audio_b64,
+        "respondent_reply_audio_url": audio_url(respondent_reply_audio),
         "next_turn": "PETITIONER_REBUTTAL"
     }
 
 
 # ================= EVALUATION =================
-@router.post("/evaluate")
-async def evaluate_user_only(session_id: str, current_user=Depends(get_current_user)):
-    session = await get_session_by_id(session_id, current_user["_id"])
-    if session.get("next_turn") != "SESSION_END":
-        raise HTTPException(400, "Session not ended yet")
-
+async def build_evaluation_prompt(session: dict, run_blocking=asyncio.to_thread) -> str:
     history = session.get("history", [])
     main_argument, judge_responses, rebuttals = [], [], []
 
@@ -518,39 +980,296 @@ async def evaluate_user_only(session_id: str, current_user=Depends(get_current_u
     last_judge_q        = next((h["text"] for h in reversed(history) if h.get("role") == "judge"), "")
     last_respondent_arg = next((h["text"] for h in reversed(history) if h.get("role") == "respondent"), "")
 
-    retrieved_context_text = retrieve_context(
+    retrieved_context_text = await run_blocking(
+        retrieve_context,
         main_argument_text, last_judge_q, session.get("case_type", "default"),
         case_summary=session.get("case_summary", "")
     )
-    prompt = build_prompt(
+    return build_prompt(
         main_argument_text, last_judge_q, judge_response_text,
         last_respondent_arg, rebuttal_text, RUBRIC_TEXT, retrieved_context_text
     )
-    raw_eval_result = await asyncio.to_thread(call_llm, prompt)
-
-    import re, json
-    scores = {}
-    overall_feedback = "Evaluation completed."
-    if raw_eval_result:
-        if isinstance(raw_eval_result, dict):
-            eval_obj = raw_eval_result
-        else:
-            match = re.search(r"\{.*\}", str(raw_eval_result), re.DOTALL)
-            eval_obj = json.loads(match.group()) if match else None
-        if eval_obj:
-            scores           = eval_obj.get("scores", {})
-            overall_feedback = eval_obj.get("overall_feedback", overall_feedback)
-
-    await live_sessions_collection.update_one(
-        {"_id": session["_id"]},
+
+
+def evaluation_key(session: dict) -> str:
+    """Hash of everything an evaluation depends on: petitioner turns, rubric and model."""
+    petitioner_turns = [
+        [h.get("type") or "", h.get("text", "")]
+        for h in session.get("history", [])
+        if h.get("role") == "petitioner"
+    ]
+    payload = json.dumps(
+        {"turns": petitioner_turns, "rubric": RUBRIC_VERSION, "model": EVAL_MODEL},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvaluationIncomplete(Exception):
+    """The evaluator errored or left rubric categories unscored; nothing is stored, so it can be retried."""
+
+
+def evaluation_complete(evaluation: Optional[dict]) -> bool:
+    scores = (evaluation or {}).get("scores") or {}
+    return all(isinstance(scores.get(category), dict) for category in RUBRIC_CATEGORIES)
+
+
+def cached_evaluation(session: dict, key: str) -> Optional[dict]:
+    # Incomplete results stored before they were rejected don't count as cached
+    for entry in reversed(session.get("evaluation_history", [])):
+        if entry.get("eval_key") == key and evaluation_complete(entry.get("evaluation")):
+            return entry.get("evaluation")
+    return None
+
+
+def parse_evaluation(eval_obj: Optional[dict]) -> dict:
+    """
+    Raises:
+        EvaluationIncomplete: evaluator error, or a rubric category missing.
+    """
+    if not eval_obj or "error" in eval_obj:
+        raise EvaluationIncomplete(f"Evaluator error: {(eval_obj or {}).get('error', 'no result')}")
+    evaluation = {
+        "scores": eval_obj.get("scores") or {},
+        "overall_feedback": eval_obj.get("overall_feedback", "Evaluation completed."),
+    }
+    if not evaluation_complete(evaluation):
+        missing = [c for c in RUBRIC_CATEGORIES if not isinstance(evaluation["scores"].get(c), dict)]
+        raise EvaluationIncomplete(f"Evaluator left {len(missing)} categories unscored: {', '.join(missing)}")
+    return evaluation
+
+
+async def save_evaluation(session: dict, evaluation: dict, key: str):
+    # The eval_key guard keeps a racing second worker from appending a duplicate;
+    # an incomplete entry stored before those were rejected doesn't block the retry
+    timestamp = datetime.utcnow()
+    before = await live_sessions_collection.find_one_and_update(
+        {"_id": session["_id"],
+         "evaluation_history": {"$not": {"$elemMatch": {"eval_key": key, "complete": True}}}},
         {"$push": {"evaluation_history": {
             "party": "petitioner",
-            "timestamp": datetime.utcnow(),
-            "evaluation": {"scores": scores, "overall_feedback": overall_feedback}
-        }}}
+            "timestamp": timestamp,
+            "eval_key": key,
+            "complete": True,
+            "evaluation": evaluation
+        }}},
+        projection={"user_id": 1, "evaluation_history": {"$slice": 1}},
+        return_document=ReturnDocument.BEFORE
     )
+    # Only the session's first evaluation feeds the dashboard stats
+    if before is not None and not before.get("evaluation_history"):
+        await record_evaluation(before["user_id"], session, evaluation, timestamp)
+
+
+async def run_evaluation(session: dict, key: str, run_blocking=asyncio.to_thread,
+                         deadline: Optional[float] = None) -> dict:
+    """deadline (time.monotonic()) caps the LLM call's own timeout, so it can't outlive its job."""
+    prompt = await build_evaluation_prompt(session, run_blocking)
+    timeout = EVAL_LLM_TIMEOUT_S
+    if deadline is not None:
+        timeout = max(1.0, min(timeout, deadline - time.monotonic()))
+    # JSON mode: call_llm returns a dict, or an {"error": ...} dict
+    evaluation = parse_evaluation(await run_blocking(call_llm, prompt, timeout=timeout))
+    await save_evaluation(session, evaluation, key)
+    return evaluation
+
+
+def evaluation_flight_key(session_id, key: str) -> str:
+    return f"{session_id}:{key}"
+
+
+async def evaluation_job(job: dict) -> dict:
+    """
+    evaluation_jobs handler: reload the transcript and evaluate it on the
+    queue's threads. It shares evaluation_flights with /evaluate/stream, so
+    a stream already evaluating this transcript is joined, not repeated.
+    An incomplete evaluation raises, which fails the job.
+    """
+    deadline = time.monotonic() + evaluation_jobs.timeout_s
+    session = await get_session_history(job["session_id"], job["user_id"], evaluations=True)
+    evaluation = cached_evaluation(session, job["eval_key"])
+    if evaluation is not None:
+        return evaluation
+    return await evaluation_flights.do(
+        evaluation_flight_key(job["session_id"], job["eval_key"]),
+        lambda: run_evaluation(session, job["eval_key"], evaluation_jobs.run_blocking, deadline)
+    )
+
 
+@router.post("/evaluate")
+async def evaluate_user_only(session_id: str, response: Response,
+                             current_user=Depends(get_current_user)):
+    """
+    A stored evaluation of this transcript comes back at once (200).
+    Otherwise the evaluation is queued and the reply is 202 with a job id:
+    poll status_url, or follow events_url (SSE) for the result.
+    """
+    session = await get_session_history(session_id, current_user["_id"], evaluations=True)
+    if session.get("next_turn") != "SESSION_END":
+        raise HTTPException(400, "Session not ended yet")
+
+    key = evaluation_key(session)
+    evaluation = cached_evaluation(session, key)
+    if evaluation is not None:
+        return {
+            "session_id": str(session["_id"]),
+            "evaluation": evaluation,
+            "cached": True
+        }
+
+    try:
+        job = await evaluation_jobs.submit(str(session["_id"]), current_user["_id"], key)
+    except EvaluationQueueFull as e:
+        raise HTTPException(
+            429,
+            {"message": "Evaluation queue is full, please retry.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    response.status_code = status.HTTP_202_ACCEPTED
     return {
-        "session_id": str(session["_id"]),
-        "evaluation": {"scores": scores, "overall_feedback": overall_feedback}
-    }
\ No newline at end of file
+        **job_view(job),
+        "cached": False,
+        "status_url": f"/moot/evaluate/jobs/{job['_id']}",
+        "events_url": f"/moot/evaluate/jobs/{job['_id']}/events",
+    }
+
+
+@router.get("/evaluate/jobs/{job_id}")
+async def evaluation_job_status(job_id: str, current_user=Depends(get_current_user)):
+    job = await evaluation_jobs.get(job_id, current_user["_id"])
+    if not job:
+        raise HTTPException(404, "Evaluation job not found")
+    return job_view(job)
+
+
+@router.get("/evaluate/jobs/{job_id}/events")
+async def evaluation_job_events(job_id: str, current_user=Depends(get_current_user)):
+    """
+    SSE: `status` on every state change, then `evaluation` + `done` — or
+    `error` if the job fails. Jobs run by another worker process are
+    picked up by polling every EVAL_EVENTS_POLL_S.
+    """
+    job = await evaluation_jobs.get(job_id, current_user["_id"])
+    if not job:
+        raise HTTPException(404, "Evaluation job not found")
+
+    async def event_generator():
+        current, last_status = job, None
+        while True:
+            if current is None:
+                yield sse_event("error", {"message": "Evaluation job not found."})
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield sse_event("status", {"job_id": job_id, "status": last_status})
+            if last_status == "done":
+                yield sse_event("evaluation", {"session_id": current["session_id"],
+                                               "evaluation": current.get("evaluation")})
+                yield sse_event("done", {})
+                return
+            if last_status == "failed":
+                yield sse_event("error", {"message": "Evaluation failed.", "job_id": job_id})
+                return
+            await evaluation_jobs.wait(job_id, EVAL_EVENTS_POLL_S)
+            current = await evaluation_jobs.get(job_id, current_user["_id"])
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+# ================= EVALUATION (SSE STREAMING) =================
+@router.get("/evaluate/stream")
+async def evaluate_stream(session_id: str, current_user=Depends(get_current_user)):
+    session = await get_session_history(session_id, current_user["_id"], evaluations=True)
+    if session.get("next_turn") != "SESSION_END":
+        raise HTTPException(400, "Session not ended yet")
+
+    key = evaluation_key(session)
+
+    def category_event(category: str, block: dict, completed: int) -> str:
+        return sse_event("category_score", {
+            "category": category,
+            "score": block.get("score"),
+            "justification": block.get("justification", ""),
+            "completed": completed,
+            "total": len(RUBRIC_CATEGORIES),
+        })
+
+    def replay(evaluation: dict):
+        for i, (category, block) in enumerate(evaluation.get("scores", {}).items(), 1):
+            if isinstance(block, dict):
+                yield category_event(category, block, i)
+        yield sse_event("evaluation", {"session_id": str(session["_id"]), "evaluation": evaluation})
+        yield sse_event("done", {})
+
+    async def event_generator():
+        evaluation = cached_evaluation(session, key)
+        if evaluation is not None:
+            for event in replay(evaluation):
+                yield event
+            return
+
+        # A queued job, or one running in another process, is followed instead of repeated
+        job = await evaluation_jobs.active(str(session["_id"]), key)
+        if job is not None:
+            job = await evaluation_jobs.finished(job["_id"], current_user["_id"], EVAL_EVENTS_POLL_S)
+            if job is None or job["status"] != "done":
+                yield sse_event("error", {"message": "Evaluation failed."})
+                return
+            for event in replay(job.get("evaluation") or {}):
+                yield event
+            return
+
+        # Only after the job check: a job joins this flight, so leading it while following a job would deadlock
+        flight_key = evaluation_flight_key(session["_id"], key)
+        flight, leader = evaluation_flights.join_or_lead(flight_key)
+        if not leader:
+            # Someone is already evaluating this transcript — wait for it
+            try:
+                evaluation = await asyncio.shield(flight)
+            except Exception as e:
+                logger.error(f"Joined evaluation failed: {e}")
+                yield sse_event("error", {"message": "Evaluation failed."})
+                return
+            for event in replay(evaluation):
+                yield event
+            return
+
+        parser = ScoreStreamParser()
+        try:
+            # Same threads and permits as the job path, not the default executor
+            prompt = await build_evaluation_prompt(session, evaluation_jobs.run_blocking)
+            async for delta in iterate_in_thread(lambda: stream_llm(prompt),
+                                                 run_blocking=evaluation_jobs.run_blocking):
+                for category, block in parser.feed(delta):
+                    yield category_event(category, block, len(parser.completed))
+            evaluation = parse_evaluation(parser.result())
+            await save_evaluation(session, evaluation, key)
+        except Exception as e:
+            logger.error(f"Streaming evaluation failed: {e}")
+            yield sse_event("error", {"message": "Evaluation failed."})
+            return
+        finally:
+            # Also runs if the client disconnects mid-stream, so joiners never hang
+            if evaluation is None:
+                evaluation_flights.land(flight_key, error=RuntimeError("Evaluation did not complete"))
+            else:
+                evaluation_flights.land(flight_key, result=evaluation)
+
+        yield sse_event("evaluation", {"session_id": str(session["_id"]), "evaluation": evaluation})
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
@@ -0,0 +1,157 @@
+"""
+Index bootstrap and query-plan check for the hot queries
+File: app/database/indexes.py
+Run: python -m app.database.indexes [--explain]
+
+ensure_indexes() runs at startup. create_indexes is idempotent, so an
+existing index with the same spec is a no-op; an index that cannot be
+built (e.g. duplicates under a unique key) is logged, not fatal.
+explain_hot_queries() runs explain() on every hot query and flags the
+ones whose winning plan is a COLLSCAN.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.database.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    # every authenticated request (cookie path)
+    "sessions": [
+        IndexModel([("session_id", ASCENDING)], unique=True, name="session_id_unique"),
+    ],
+    # login / register
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    # {_id, user_id} lookups are served by the _id index;
+    # /auth/user/history pages through a user's sessions newest first (by _id)
+    "live_sessions": [
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_sessions"),
+    ],
+    # transcript buckets, read in bucket order per session
+    "session_turns": [
+        IndexModel([("session_id", ASCENDING), ("bucket", ASCENDING)], unique=True, name="session_bucket"),
+    ],
+    "judge_questions": [
+        IndexModel([("case_type", ASCENDING)], name="case_type"),
+    ],
+    "cases": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "moot-problems": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    # one job per transcript + rubric; claimable jobs are found on startup;
+    # finished jobs are kept for a week
+    "evaluation_jobs": [
+        IndexModel([("session_id", ASCENDING), ("eval_key", ASCENDING)], unique=True, name="session_eval_key"),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease"),
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=7 * 86400, name="finished_at_ttl"),
+    ],
+    # revoked token ids disappear once the token itself has expired
+    "revoked_tokens": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+_SAMPLE_ID = ObjectId()
+
+# (collection, filter, sort) — the shapes the routes actually issue
+HOT_QUERIES = [
+    ("sessions", {"session_id": "x"}, None),
+    ("users", {"_id": _SAMPLE_ID}, None),
+    ("users", {"username": "x"}, None),
+    ("users", {"email": "x"}, None),
+    ("live_sessions", {"_id": _SAMPLE_ID, "user_id": _SAMPLE_ID}, None),
+    ("live_sessions", {"user_id": _SAMPLE_ID, "_id": {"$lt": _SAMPLE_ID}}, [("_id", DESCENDING)]),
+    ("user_stats", {"_id": _SAMPLE_ID}, None),
+    ("session_turns", {"session_id": _SAMPLE_ID}, [("bucket", DESCENDING)]),
+    ("session_turns", {"session_id": _SAMPLE_ID, "bucket": 0}, None),
+    ("judge_questions", {"case_type": "x"}, None),
+    ("cases", {"id": "x"}, None),
+    ("moot-problems", {"id": "x"}, None),
+    ("cases", {"id": {"$gt": "x"}}, [("id", ASCENDING)]),
+    ("moot-problems", {"id": {"$gt": "x"}}, [("id", ASCENDING)]),
+    ("audio_renders", {"_id": "x"}, None),
+    ("evaluation_jobs", {"session_id": "x", "eval_key": "x"}, None),
+    ("evaluation_jobs", {"_id": "x", "user_id": _SAMPLE_ID}, None),
+    ("revoked_tokens", {"expires_at": {"$gt": datetime.utcnow()}}, None),
+]
+
+
+async def ensure_indexes() -> dict:
+    report = {}
+    for collection, models in INDEXES.items():
+        try:
+            report[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            logger.error(f"[indexes] {collection}: {e}")
+            report[collection] = f"error: {e.code}"
+    logger.info(f"[indexes] ensured {report}")
+    return report
+
+
+def _stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return [s for s in stages if s]
+
+
+async def explain_hot_queries() -> List[dict]:
+    results = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain()).get("queryPlanner", {}).get("winningPlan", {})
+        stages = _stages(plan)
+        results.append({
+            "collection": collection,
+            "filter": sorted(query),
+            "sort": [k for k, _ in sort] if sort else None,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    for r in results:
+        if r["collscan"]:
+            logger.warning(f"[indexes] COLLSCAN on {r['collection']} filter={r['filter']} sort={r['sort']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes and check hot query plans")
+    parser.add_argument("--explain", action="store_true", help="explain() every hot query and flag COLLSCANs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run():
+        await ensure_indexes()
+        if args.explain:
+            return await explain_hot_queries()
+        return []
+
+    results = asyncio.run(_run())
+    for r in results:
+        flag = "COLLSCAN" if r["collscan"] else "ok"
+        print(f"  {flag:<8} {r['collection']:<16} filter={r['filter']} sort={r['sort']} "
+              f"plan={' > '.join(r['stages'])}")
+    if any(r["collscan"] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 # app/database/mongodb.py
 
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 
 MONGO_URL = "mongodb://localhost:27017"
 
@@ -14,4 +14,17 @@ sessions_collection = db["sessions"]  # Required for session-based auth
 live_sessions_collection = db["live_sessions"]
 case_histories_collection = db["case_histories"]
 judge_questions_collection = db["judge_questions"]
-session_history_collection = db["session_history"]
\ No newline at end of file
+session_history_collection = db["session_history"]
+
+# Audio blobs live in GridFS; history entries only hold the audio id
+audio_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="audio")
+# Deferred TTS jobs (lazy audio mode), keyed by the id handed to clients
+audio_renders_collection = db["audio_renders"]
+# Revoked JWT ids until their expiry (TTL index, see indexes.py)
+revoked_tokens_collection = db["revoked_tokens"]
+# Per-user dashboard summary, updated on each completed evaluation (see user_stats)
+user_stats_collection = db["user_stats"]
+# Transcript entries, bucketed per session (see session_store)
+session_turns_collection = db["session_turns"]
+# Background evaluation jobs and their results (see eval_jobs)
+evaluation_jobs_collection = db["evaluation_jobs"]
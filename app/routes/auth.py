@@ -1,13 +1,19 @@
 # backend/app/routes/auth.py
-from fastapi import APIRouter, HTTPException, Response, Cookie, Depends
+from fastapi import APIRouter, HTTPException, Response, Cookie, Depends, Header, Query
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 import uuid
 from bson import ObjectId
 from datetime import datetime
+from jose import JWTError
 from passlib.context import CryptContext
 
-from app.database.mongodb import users_collection, sessions_collection, live_sessions_collection
+from app.database.mongodb import users_collection, sessions_collection
+from app.services.session_store import list_session_summaries
+from app.services.user_stats import get_user_stats
+from app.utils.jwt_utils import create_token_pair, decode_token, REFRESH_TOKEN_DAYS
+from app.services.revocation import revocation_list
+from app.services.password_pool import password_pool, PasswordQueueFull
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -22,6 +28,9 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 # ------------------------------- Password Helpers -------------------------------
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -29,34 +38,113 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt blocks for ~100 ms — routes await these instead, so it runs on the password pool
+async def hash_password_async(password: str) -> str:
+    return await _password_job("hash", hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _password_job("verify", verify_password, plain_password, hashed_password)
+
+async def _password_job(op: str, fn, *args):
+    try:
+        return await password_pool.run(op, fn, *args)
+    except PasswordQueueFull as e:
+        raise HTTPException(status_code=503, detail="Server busy, please retry",
+                            headers={"Retry-After": str(e.retry_after)})
+
+# ------------------------------- Token Helpers -------------------------------
+# How each request was authenticated — token requests cost no Mongo round-trip
+auth_stats = {"token": 0, "session": 0}
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip() or None
+    return None
+
+def set_token_cookies(response: Response, tokens: dict):
+    response.set_cookie(
+        key="access_token",
+        value=tokens["access_token"],
+        max_age=tokens["expires_in"],
+        httponly=True,
+        samesite="lax",
+        secure=False,
+        path="/"
+    )
+    response.set_cookie(
+        key="refresh_token",
+        value=tokens["refresh_token"],
+        max_age=REFRESH_TOKEN_DAYS * 24 * 3600,
+        httponly=True,
+        samesite="lax",
+        secure=False,
+        path="/auth"
+    )
+
+async def revoke_token(token: Optional[str], token_type: str):
+    if not token:
+        return
+    try:
+        claims = decode_token(token, token_type)
+    except JWTError:
+        return  # already invalid
+    await revocation_list.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
+
+async def user_from_token(token: str) -> Optional[dict]:
+    """Verified claims as a minimal user dict, or None if the token is unusable."""
+    try:
+        claims = decode_token(token, "access")
+    except JWTError:
+        return None
+    if await revocation_list.is_revoked(claims["jti"]):
+        return None
+    return {"_id": ObjectId(claims["sub"]), "username": claims["username"]}
+
 # ------------------------------- Reusable Dependency -------------------------------
-async def get_current_user(session_cookie: Optional[str] = Cookie(default=None)):
-    """Get user from auth cookie (renamed to avoid conflict with path params)."""
+async def get_current_user(
+    authorization: Optional[str] = Header(default=None),
+    access_token: Optional[str] = Cookie(default=None),
+    session_cookie: Optional[str] = Cookie(default=None)
+):
+    """
+    Signed access token (Authorization: Bearer or the access_token cookie)
+    first — no database access. Falls back to the session cookie.
+    Token users carry only _id and username.
+    """
+    token = bearer_token(authorization) or access_token
+    if token:
+        user = await user_from_token(token)
+        if user:
+            auth_stats["token"] += 1
+            return user
+        if not session_cookie:
+            raise HTTPException(status_code=401, detail="Token expired or revoked")
     if not session_cookie:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    session = await sessions_collection.find_one({"session_id": session_cookie})
+    session = await sessions_collection.find_one({"session_id": session_cookie}, {"user_id": 1})
     if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
     user_id = session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Session invalid: missing user_id")
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"username": 1, "email": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    auth_stats["session"] += 1
     return user
 
 # ------------------------------- Registration -------------------------------
 @router.post("/auth/register")
 async def register_user(user: UserRegister, response: Response):
-    if await users_collection.find_one({"username": user.username}):
+    if await users_collection.find_one({"username": user.username}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Username already taken")
-    if await users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user_dict = {
         "username": user.username,
         "email": user.email,
-        "hashed_password": hash_password(user.password),
+        "hashed_password": await hash_password_async(user.password),
         "created_at": datetime.utcnow()
     }
 
@@ -80,20 +168,26 @@ async def register_user(user: UserRegister, response: Response):
         path="/"
     )
 
+    tokens = create_token_pair(str(user_id), user.username)
+    set_token_cookies(response, tokens)
+
     return {
         "message": f"Hi {user.username}, your account has been created.",
         "user": {
             "user_id": str(user_id),
             "username": user.username,
             "email": user.email,
-        }
+        },
+        **tokens
     }
 
 # ------------------------------- Login -------------------------------
 @router.post("/auth/login")
 async def login_user(user: UserLogin, response: Response):
-    db_user = await users_collection.find_one({"username": user.username})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    db_user = await users_collection.find_one(
+        {"username": user.username}, {"username": 1, "email": 1, "hashed_password": 1}
+    )
+    if not db_user or not await verify_password_async(user.password, db_user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     session_id = str(uuid.uuid4())
@@ -112,18 +206,55 @@ async def login_user(user: UserLogin, response: Response):
         path="/"
     )
 
+    tokens = create_token_pair(str(db_user["_id"]), db_user["username"])
+    set_token_cookies(response, tokens)
+
     return {
         "message": f"Hi {db_user['username']}, you’re now logged in.",
         "user": {
             "user_id": str(db_user["_id"]),
             "username": db_user["username"],
             "email": db_user["email"]
-        }
+        },
+        **tokens
     }
 
+# ------------------------------- Refresh -------------------------------
+@router.post("/auth/refresh")
+async def refresh_tokens(response: Response, req: Optional[RefreshRequest] = None,
+                         refresh_token: Optional[str] = Cookie(default=None)):
+    """
+    Swap a refresh token for a new pair; the old refresh token is revoked
+    (rotation). The revocation itself is the check: of two concurrent
+    requests with the same token, only the one whose insert wins gets tokens.
+    """
+    token = (req.refresh_token if req else None) or refresh_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing refresh token")
+    try:
+        claims = decode_token(token, "refresh")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if not await revocation_list.claim(claims["jti"], datetime.utcfromtimestamp(claims["exp"])):
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    tokens = create_token_pair(claims["sub"], claims["username"])
+    set_token_cookies(response, tokens)
+    return tokens
+
 # ------------------------------- Logout -------------------------------
 @router.post("/auth/logout")
-async def logout_user(response: Response, session_cookie: Optional[str] = Cookie(default=None)):
+async def logout_user(
+    response: Response,
+    session_cookie: Optional[str] = Cookie(default=None),
+    access_token: Optional[str] = Cookie(default=None),
+    refresh_token: Optional[str] = Cookie(default=None),
+    authorization: Optional[str] = Header(default=None)
+):
+    await revoke_token(bearer_token(authorization) or access_token, "access")
+    await revoke_token(refresh_token, "refresh")
+    response.delete_cookie(key="access_token", path="/", samesite="lax", secure=False, httponly=True)
+    response.delete_cookie(key="refresh_token", path="/auth", samesite="lax", secure=False, httponly=True)
     if session_cookie:
         await sessions_collection.delete_one({"session_id": session_cookie})
         response.delete_cookie(
@@ -138,20 +269,37 @@ async def logout_user(response: Response, session_cookie: Optional[str] = Cookie
 # ------------------------------- Get Current User -------------------------------
 @router.get("/auth/me")
 async def get_me(current_user=Depends(get_current_user)):
+    email = current_user.get("email")
+    if email is None:
+        # token users carry no email
+        user = await users_collection.find_one({"_id": current_user["_id"]}, {"email": 1})
+        email = user.get("email") if user else None
     return {
         "user_id": str(current_user["_id"]),
         "username": current_user["username"],
-        "email": current_user["email"]
+        "email": email
     }
 
+@router.get("/auth/user/stats")
+async def get_user_stats_route(current_user=Depends(get_current_user)):
+    """Dashboard summary: evaluated sessions, rubric averages, latest sessions."""
+    return await get_user_stats(current_user["_id"])
+
 @router.get("/auth/user/history")
-async def get_user_history(current_user=Depends(get_current_user)):
+async def get_user_history(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),  # unpaged clients keep the old 100 newest
+    current_user=Depends(get_current_user)
+):
     user_id = current_user["_id"]  
 
-   
-    sessions = await live_sessions_collection.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).to_list(length=100)
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    sessions, next_cursor = await list_session_summaries(user_id, limit=limit, cursor=cursor)
+    if next_cursor:
+        # Body stays a plain list; the next page is in a header (as /cases, exposed via CORS)
+        response.headers["X-Next-Cursor"] = next_cursor
 
     formatted_sessions = []
 
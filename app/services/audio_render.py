@@ -0,0 +1,110 @@
+# app/services/audio_render.py
+"""
+Deferred TTS for turns.
+
+In `lazy` / `background` mode a turn records a render job and returns its
+id straight away; the text response never waits on synthesis. The clip is
+rendered either by a background task (`background`) or on the first
+GET /moot/audio/{id} (`lazy`), and persisted to GridFS under that same id.
+Clients that never fetch audio in `lazy` mode cost no TTS at all.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from app.database.mongodb import audio_renders_collection
+from app.services.audio_store import audio_exists, save_audio
+from app.services.deadlines import run_stage
+from app.services.singleflight import SingleFlight
+from rag.moot_rag.audio.tts import synthesize, get_engine
+from rag.moot_rag.audio.tts_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+AUDIO_RENDER_MODES = ("eager", "background", "lazy")
+AUDIO_RENDER_DEFAULT = os.getenv("AUDIO_RENDER_MODE", "eager")
+AUDIO_RENDER_TIMEOUT_S = float(os.getenv("AUDIO_RENDER_TIMEOUT_S", "30"))
+
+render_flights = SingleFlight()
+_background_tasks: set = set()
+
+
+def render_id(text: str, voice: str) -> str:
+    # Same key as the TTS cache, so a deferred render of a known clip is a disk hit
+    engine = get_engine()
+    return cache_key(engine.voice_name(voice), text, engine.version, engine.mime)
+
+
+async def schedule_render(text: str, voice: str, background: bool = False,
+                          owner: Optional[dict] = None) -> Optional[dict]:
+    """
+    Record a render job and return the audio reference to store on the turn.
+    Jobs are shared by identical clips; each scheduling owner is added to
+    the job, which is what authorizes fetching the clip.
+    """
+    if not text or not text.strip():
+        return None
+    rid = render_id(text, voice)
+    update = {"$setOnInsert": {
+        "text": text,
+        "voice": voice,
+        "status": "pending",
+        "created_at": datetime.utcnow()
+    }}
+    if owner:
+        update["$addToSet"] = {"user_ids": owner["user_id"], "session_ids": owner["session_id"]}
+    await audio_renders_collection.update_one({"_id": rid}, update, upsert=True)
+    if background:
+        task = asyncio.ensure_future(render(rid))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    return {"audio_id": rid, "audio_mime": get_engine().mime, "audio_deferred": True}
+
+
+async def render(rid: str) -> bool:
+    """Render a scheduled clip once; concurrent callers share the same synthesis."""
+    return await render_flights.do(rid, lambda: _render(rid))
+
+
+async def _render(rid: str) -> bool:
+    if await audio_exists(rid):
+        return True
+    job = await audio_renders_collection.find_one({"_id": rid})
+    if not job:
+        return False
+    try:
+        audio_bytes = await run_stage(
+            "tts",
+            lambda: synthesize(job["text"], job["voice"], AUDIO_RENDER_TIMEOUT_S),
+            AUDIO_RENDER_TIMEOUT_S
+        )
+        ref = await save_audio(audio_bytes, get_engine().mime, audio_id=rid)
+    except Exception as e:
+        logger.warning(f"Deferred render {rid} failed: {e}")
+        await audio_renders_collection.update_one(
+            {"_id": rid}, {"$set": {"status": "failed", "error": str(e)}}
+        )
+        return False
+    await audio_renders_collection.update_one(
+        {"_id": rid},
+        {"$set": {
+            "status": "ready",
+            "audio_size": ref["audio_size"],
+            "audio_duration": ref["audio_duration"],
+            "rendered_at": datetime.utcnow()
+        }}
+    )
+    return True
+
+
+async def has_render_job(rid: str, user_id=None) -> bool:
+    query = {"_id": rid}
+    if user_id is not None:
+        query["user_ids"] = user_id
+    return await audio_renders_collection.find_one(query, {"_id": 1}) is not None
+
+
+def render_stats() -> dict:
+    return {**render_flights.snapshot(), "background": len(_background_tasks)}
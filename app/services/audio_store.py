@@ -0,0 +1,185 @@
+# app/services/audio_store.py
+"""
+Content-addressed audio blobs in GridFS.
+
+History entries and SSE events reference clips by id (sha256 of the bytes)
+instead of carrying base64 inline, which keeps live_sessions documents
+small and lets clients stream / cache audio over HTTP.
+
+A clip is content-addressed, so two sessions can share one file. Its
+metadata keeps every user and session that stored it (user_ids /
+session_ids); /moot/audio only serves a clip to a user listed there, or
+to one whose deferred render job it is. Files stored before owners were
+recorded are backfilled from the transcripts:
+    python -m app.services.audio_store
+"""
+import asyncio
+import hashlib
+import logging
+import struct
+from typing import Iterable, Optional, Tuple
+
+from gridfs.errors import FileExists, NoFile
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb import audio_bucket, db, live_sessions_collection, session_turns_collection
+
+logger = logging.getLogger(__name__)
+
+AUDIO_URL_PREFIX = "/moot/audio"
+EDGE_TTS_BITRATE = 48000  # edge-tts default: audio-24khz-48kbitrate-mono-mp3
+
+_audio_files = db["audio.files"]
+
+
+def audio_id_for(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_duration(data: bytes, mime: str) -> Optional[float]:
+    if mime == "audio/mpeg":
+        return round(len(data) * 8 / EDGE_TTS_BITRATE, 2)
+    if mime in ("audio/wav", "audio/x-wav") and data[:4] == b"RIFF" and len(data) > 44:
+        byte_rate = struct.unpack("<I", data[28:32])[0]
+        return round((len(data) - 44) / byte_rate, 2) if byte_rate else None
+    return None
+
+
+def audio_owner(user_id, session_id) -> dict:
+    return {"user_id": user_id, "session_id": str(session_id)}
+
+
+async def add_audio_owners(audio_id: str, user_ids: Iterable, session_ids: Iterable = ()):
+    await _audio_files.update_one({"_id": audio_id}, {"$addToSet": {
+        "metadata.user_ids": {"$each": list(user_ids)},
+        "metadata.session_ids": {"$each": list(session_ids)},
+    }})
+
+
+async def save_audio(data: bytes, mime: str, duration: Optional[float] = None,
+                     audio_id: Optional[str] = None, owner: Optional[dict] = None) -> Optional[dict]:
+    """
+    Store a clip once and return the reference kept on history entries.
+    `audio_id` defaults to the content hash; deferred renders pass the id
+    they already handed out. `owner` (see audio_owner) is added to the
+    clip's owners whether or not the bytes were already stored.
+    """
+    if not data:
+        return None
+    audio_id = audio_id or audio_id_for(data)
+    if duration is None:
+        duration = estimate_duration(data, mime)
+    user_ids = [owner["user_id"]] if owner else []
+    session_ids = [owner["session_id"]] if owner else []
+    stored = False
+    if not await audio_exists(audio_id):
+        try:
+            await audio_bucket.upload_from_stream_with_id(
+                audio_id, audio_id, data, metadata={
+                    "mime": mime, "duration": duration,
+                    "user_ids": user_ids, "session_ids": session_ids,
+                }
+            )
+            stored = True
+        except (FileExists, DuplicateKeyError):
+            pass  # same bytes stored concurrently
+    if owner and not stored:
+        await add_audio_owners(audio_id, user_ids, session_ids)
+    return {
+        "audio_id": audio_id,
+        "audio_size": len(data),
+        "audio_mime": mime,
+        "audio_duration": duration,
+    }
+
+
+async def audio_exists(audio_id: str) -> bool:
+    return await _audio_files.find_one({"_id": audio_id}, {"_id": 1}) is not None
+
+
+async def audio_owned(audio_id: str, user_id) -> bool:
+    return await _audio_files.find_one(
+        {"_id": audio_id, "metadata.user_ids": user_id}, {"_id": 1}
+    ) is not None
+
+
+async def open_audio(audio_id: str):
+    try:
+        return await audio_bucket.open_download_stream(audio_id)
+    except NoFile:
+        return None
+
+
+def audio_url(ref: Optional[dict]) -> Optional[str]:
+    if not ref or not ref.get("audio_id"):
+        return None
+    return f"{AUDIO_URL_PREFIX}/{ref['audio_id']}"
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end).
+    Returns None when the range cannot be satisfied; only the first range
+    of a multi-range request is served.
+    """
+    if not header.startswith("bytes=") or size == 0:
+        return None
+    spec = header[len("bytes="):].split(",")[0].strip()
+    start_s, _, end_s = spec.partition("-")
+    try:
+        if not start_s:
+            length = int(end_s)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+# ================= OWNER BACKFILL =================
+def _entry_audio_ids(entries: list) -> set:
+    ids = set()
+    for entry in entries or []:
+        if entry.get("audio_id"):
+            ids.add(entry["audio_id"])
+        for part in entry.get("audio_parts") or []:
+            if part.get("audio_id"):
+                ids.add(part["audio_id"])
+    return ids
+
+
+async def backfill_owners() -> int:
+    """Record owners on clips referenced by transcripts (legacy history and session_turns)."""
+    projection = {"user_id": 1, "history.audio_id": 1, "history.audio_parts.audio_id": 1}
+    owners, updated = {}, 0
+    async for session in live_sessions_collection.find({}, projection):
+        owners[session["_id"]] = session["user_id"]
+        for audio_id in _entry_audio_ids(session.get("history")):
+            await add_audio_owners(audio_id, [session["user_id"]], [str(session["_id"])])
+            updated += 1
+    cursor = session_turns_collection.find(
+        {}, {"session_id": 1, "entries.audio_id": 1, "entries.audio_parts.audio_id": 1}
+    )
+    async for bucket in cursor:
+        user_id = owners.get(bucket["session_id"])
+        if user_id is None:
+            continue
+        for audio_id in _entry_audio_ids(bucket.get("entries")):
+            await add_audio_owners(audio_id, [user_id], [str(bucket["session_id"])])
+            updated += 1
+    return updated
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    updated = asyncio.run(backfill_owners())
+    print(f"  recorded owners on {updated} clip references")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# app/services/deadlines.py
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Whole respondent turn must finish inside this budget; each stage gets a
+# share of it, capped by whatever is left when the stage starts.
+TURN_BUDGET_S = float(os.getenv("MOOT_TURN_BUDGET_S", "60"))
+
+STAGE_SHARES = {
+    "respondent_rag": 0.5,
+    "judge_reply":    0.35,
+    "judge_question": 0.05,
+    "tts":            0.25,
+}
+
+# Only idempotent stages belong here — a hedge sends the same request twice
+HEDGED_STAGES = {
+    s.strip() for s in os.getenv("MOOT_HEDGED_STAGES", "tts").split(",") if s.strip()
+}
+HEDGE_MIN_DELAY_S = float(os.getenv("MOOT_HEDGE_MIN_DELAY_S", "1.5"))
+HEDGE_MIN_SAMPLES = 20
+
+_RAISE = object()
+
+
+class TurnBudget:
+    """Per-turn deadline that is split across stages."""
+
+    def __init__(self, total_s: float = TURN_BUDGET_S):
+        self.total_s = total_s
+        self.deadline = time.monotonic() + total_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, stage: str) -> float:
+        share = STAGE_SHARES.get(stage, 1.0)
+        return min(self.total_s * share, self.remaining())
+
+
+class StageMetrics:
+    """Rolling latency samples plus timeout / hedge counters per stage."""
+
+    def __init__(self, window: int = 500):
+        self.samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.hedges: Dict[str, int] = defaultdict(int)
+        self.hedge_wins: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def percentile(self, stage: str, pct: float) -> Optional[float]:
+        data = sorted(self.samples[stage])
+        if not data:
+            return None
+        idx = min(len(data) - 1, int(round(pct / 100 * (len(data) - 1))))
+        return data[idx]
+
+    def hedge_delay(self, stage: str) -> float:
+        """Fire the backup request once the primary is slower than p95."""
+        if len(self.samples[stage]) < HEDGE_MIN_SAMPLES:
+            return HEDGE_MIN_DELAY_S
+        return max(HEDGE_MIN_DELAY_S, self.percentile(stage, 95))
+
+    def snapshot(self) -> dict:
+        stages = set(self.samples) | set(self.timeouts) | set(self.hedges)
+        out = {}
+        for stage in sorted(stages):
+            out[stage] = {
+                "count": len(self.samples[stage]),
+                "p50": self.percentile(stage, 50),
+                "p95": self.percentile(stage, 95),
+                "p99": self.percentile(stage, 99),
+                "timeouts": self.timeouts[stage],
+                "hedges": self.hedges[stage],
+                "hedge_wins": self.hedge_wins[stage],
+                "hedged": stage in HEDGED_STAGES,
+            }
+        return out
+
+
+stage_metrics = StageMetrics()
+
+
+async def _hedged(stage: str, make_call: Callable[[], Awaitable]):
+    primary = asyncio.ensure_future(make_call())
+    pending = {primary}
+    backup = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=stage_metrics.hedge_delay(stage))
+        if not done:
+            stage_metrics.hedges[stage] += 1
+            backup = asyncio.ensure_future(make_call())
+            pending.add(backup)
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup:
+                        stage_metrics.hedge_wins[stage] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in (primary, backup):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def run_stage(
+    stage: str,
+    make_call: Callable[[], Awaitable],
+    timeout: Optional[float],
+    fallback=_RAISE,
+):
+    """
+    Run one external stage under its deadline.
+
+    make_call must return a fresh awaitable on each call so the stage can be
+    hedged. On timeout the fallback is returned, or asyncio.TimeoutError is
+    raised if no fallback was given.
+    """
+    t0 = time.perf_counter()
+    call = _hedged(stage, make_call) if stage in HEDGED_STAGES else make_call()
+    try:
+        result = await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        stage_metrics.timeouts[stage] += 1
+        logger.warning(f"Stage {stage} exceeded its {timeout:.1f}s budget")
+        if fallback is _RAISE:
+            raise
+        return fallback
+    stage_metrics.record(stage, time.perf_counter() - t0)
+    return result
@@ -0,0 +1,294 @@
+# app/services/eval_jobs.py
+"""
+Background evaluation jobs.
+
+/moot/evaluate no longer runs retrieval and the evaluator LLM inside the
+request. It records a job in `evaluation_jobs` and queues it here; a fixed
+set of worker tasks runs the jobs, and the blocking parts (embedding,
+Chroma, reranking, the LLM call) go to this queue's own thread pool rather
+than the default executor the TTS/RAG paths share.
+
+Job state lives in Mongo, so the status and SSE endpoints work from any
+process and a restart loses nothing. A job is claimed with a lease: a
+queued job, or a running one whose lease has lapsed (its process died),
+can be claimed by exactly one worker. One job exists per
+{session_id, eval_key}, so double-submits share it; /moot/evaluate/stream
+follows that job rather than starting its own, and otherwise streams on
+this queue's threads, so both paths share one dedup and one thread limit.
+
+A job that times out is failed, but its blocking call keeps its thread
+until it returns. Each blocking call therefore holds one of
+EVAL_BLOCKING_THREADS permits until its thread is free, so abandoned
+calls delay new work rather than piling up threads. The handler should
+also pass what is left of the job's time to its LLM call, so an abandoned
+call ends soon after its job.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from app.database.mongodb import evaluation_jobs_collection
+from app.services.deadlines import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "2"))
+EVAL_QUEUE_MAX = int(os.getenv("EVAL_QUEUE_MAX", "32"))
+EVAL_JOB_TIMEOUT_S = float(os.getenv("EVAL_JOB_TIMEOUT_S", "180"))
+# Threads for blocking evaluation work; the spare ones absorb calls outliving a timed-out job
+EVAL_BLOCKING_THREADS = int(os.getenv("EVAL_BLOCKING_THREADS", str(EVAL_WORKERS * 2)))
+
+
+class EvaluationQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Evaluation queue is full")
+        self.retry_after = retry_after
+
+
+class EvaluationJobs:
+    def __init__(self, workers: int = EVAL_WORKERS, max_queue: int = EVAL_QUEUE_MAX,
+                 timeout_s: float = EVAL_JOB_TIMEOUT_S, threads: int = EVAL_BLOCKING_THREADS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.threads = max(threads, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="eval")
+        self._permits: Optional[asyncio.Semaphore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[Callable[[dict], Awaitable[dict]]] = None
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._reserved = 0
+        self.latency = StageMetrics()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def start(self, handler: Callable[[dict], Awaitable[dict]]):
+        """handler(job) -> evaluation; runs once per claimed job."""
+        self._handler = handler
+        self._queue = asyncio.Queue()
+        self._permits = asyncio.Semaphore(self.threads)
+        self._tasks = [asyncio.ensure_future(self._worker(i)) for i in range(self.workers)]
+
+    async def recover(self) -> int:
+        """Queue jobs left behind by a stopped process (queued, or running past their lease)."""
+        recovered = 0
+        cursor = evaluation_jobs_collection.find(self._claimable(), {"_id": 1}).limit(self.max_queue)
+        async for job in cursor:
+            self._queue.put_nowait(job["_id"])
+            recovered += 1
+        if recovered:
+            logger.info(f"[eval-jobs] recovered {recovered} jobs")
+        return recovered
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+
+    # ── submit / read ────────────────────────────────────────────────────
+    def _lease(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.timeout_s)
+
+    @staticmethod
+    def _claimable() -> dict:
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": datetime.utcnow()}},
+        ]}
+
+    async def submit(self, session_id: str, user_id, eval_key: str) -> dict:
+        if self._queue.qsize() + self._reserved >= self.max_queue:
+            self.rejected += 1
+            run_p50 = self.latency.percentile("run", 50) or 30
+            raise EvaluationQueueFull(max(1, round(self._queue.qsize() * run_p50 / self.workers)))
+
+        self._reserved += 1
+        try:
+            job_id = uuid.uuid4().hex
+            now = datetime.utcnow()
+            job = await evaluation_jobs_collection.find_one_and_update(
+                {"session_id": session_id, "eval_key": eval_key},
+                {"$setOnInsert": {
+                    "_id": job_id,
+                    "user_id": user_id,
+                    "status": "queued",
+                    "attempts": 0,
+                    "created_at": now,
+                    "enqueued_at": now,
+                    "updated_at": now,
+                    "lease_until": self._lease(),
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            if job["_id"] == job_id:
+                self._queue.put_nowait(job_id)
+            elif job["status"] == "failed" or (
+                    job["status"] in ("queued", "running") and job["lease_until"] < now):
+                # A failed job is retried on resubmit; a stale one was orphaned by a dead process
+                job = await evaluation_jobs_collection.find_one_and_update(
+                    {"_id": job["_id"], "status": job["status"]},
+                    {"$set": {"status": "queued", "error": None, "updated_at": now,
+                              "enqueued_at": now, "lease_until": self._lease()}},
+                    return_document=ReturnDocument.AFTER
+                ) or job
+                self._queue.put_nowait(job["_id"])
+            return job
+        finally:
+            self._reserved -= 1
+
+    async def get(self, job_id: str, user_id) -> Optional[dict]:
+        return await evaluation_jobs_collection.find_one({"_id": job_id, "user_id": user_id})
+
+    async def active(self, session_id: str, eval_key: str) -> Optional[dict]:
+        """The queued or running job for this transcript, unless its lease has lapsed."""
+        return await evaluation_jobs_collection.find_one({
+            "session_id": session_id, "eval_key": eval_key,
+            "status": {"$in": ["queued", "running"]}, "lease_until": {"$gte": datetime.utcnow()},
+        })
+
+    async def finished(self, job_id: str, user_id, poll_s: float) -> Optional[dict]:
+        """Wait for the job to be done or failed; None if it disappears."""
+        while True:
+            job = await self.get(job_id, user_id)
+            if job is None or job["status"] in ("done", "failed"):
+                return job
+            await self.wait(job_id, poll_s)
+
+    async def wait(self, job_id: str, timeout: float):
+        """Until this process changes the job, or timeout (for jobs run elsewhere)."""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                if self._events.get(job_id) is event:
+                    del self._events[job_id]
+
+    def _notify(self, job_id: str):
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def run_blocking(self, fn: Callable, *args, **kwargs):
+        """
+        Run sync evaluation work (retrieval, LLM) on this queue's threads.
+        The permit is returned when the thread finishes, not when the
+        caller stops waiting.
+        """
+        loop = asyncio.get_running_loop()
+        await self._permits.acquire()
+        try:
+            cfut = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._permits.release()
+            raise
+        cfut.add_done_callback(lambda f: loop.call_soon_threadsafe(self._permits.release))
+        return await asyncio.wrap_future(cfut)
+
+    # ── workers ──────────────────────────────────────────────────────────
+    async def _set(self, job_id: str, fields: dict):
+        await evaluation_jobs_collection.update_one(
+            {"_id": job_id}, {"$set": {**fields, "updated_at": datetime.utcnow()}}
+        )
+        self._notify(job_id)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[eval-jobs] worker {index} job {job_id}: {e}")
+
+    async def _run(self, job_id: str):
+        now = datetime.utcnow()
+        job = await evaluation_jobs_collection.find_one_and_update(
+            {"_id": job_id, **self._claimable()},
+            {"$set": {"status": "running", "started_at": now, "updated_at": now,
+                      "lease_until": self._lease()},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return  # done already, or claimed by another worker
+        self._notify(job_id)
+        # From the latest (re)queue: a retried job's first attempt isn't wait time
+        enqueued_at = job.get("enqueued_at") or job["created_at"]
+        self.latency.record("queue_wait", max(0.0, (now - enqueued_at).total_seconds()))
+
+        t0 = time.perf_counter()
+        try:
+            evaluation = await asyncio.wait_for(self._handler(job), self.timeout_s)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            error = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.error(f"[eval-jobs] {job_id} failed: {error}")
+            await self._set(job_id, {"status": "failed", "error": error, "finished_at": datetime.utcnow()})
+            return
+        self.latency.record("run", time.perf_counter() - t0)
+        self.completed += 1
+        await self._set(job_id, {"status": "done", "evaluation": evaluation,
+                                 "finished_at": datetime.utcnow()})
+
+    def snapshot(self) -> dict:
+        def _pcts(stage: str) -> dict:
+            return {
+                "p50": self.latency.percentile(stage, 50),
+                "p95": self.latency.percentile(stage, 95),
+            }
+        return {
+            "workers": self.workers,
+            "threads": self.threads,
+            "threads_busy": self.threads - self._permits._value if self._permits else 0,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait_s": _pcts("queue_wait"),
+            "run_s": _pcts("run"),
+        }
+
+
+def job_view(job: dict) -> dict:
+    view = {
+        "job_id": job["_id"],
+        "session_id": job["session_id"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+    }
+    for field in ("created_at", "enqueued_at", "started_at", "finished_at"):
+        if job.get(field):
+            view[field] = job[field].isoformat()
+    if job["status"] == "done":
+        view["evaluation"] = job.get("evaluation")
+    if job["status"] == "failed":
+        view["error"] = job.get("error")
+    return view
+
+
+evaluation_jobs = EvaluationJobs()
@@ -0,0 +1,81 @@
+# app/services/password_pool.py
+"""
+bcrypt off the event loop.
+
+Hashing and verification run in a dedicated, size-limited thread pool
+(the bcrypt backend releases the GIL while it works), so a burst of
+logins queues here instead of stalling every SSE stream on the worker.
+Admission is bounded: past PASSWORD_QUEUE_MAX waiting jobs new ones are
+refused at once.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from app.services.deadlines import StageMetrics
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "64"))
+
+
+class PasswordQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_queue: int = PASSWORD_QUEUE_MAX):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.latency = StageMetrics()
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, op: str, fn: Callable, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            run_p50 = self.latency.percentile("run", 50) or 0.25
+            raise PasswordQueueFull(max(1, round(self._pending * run_p50 / self.workers)))
+
+        submitted = time.perf_counter()
+
+        def _job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self._pending += 1
+        try:
+            result, wait_s, run_s = await asyncio.get_running_loop().run_in_executor(self._executor, _job)
+        finally:
+            self._pending -= 1
+        self.latency.record("queue_wait", wait_s)
+        self.latency.record("run", run_s)
+        self.latency.record(op, run_s)
+        self.completed += 1
+        return result
+
+    def snapshot(self) -> dict:
+        def _pcts(stage: str) -> dict:
+            return {
+                "p50": self.latency.percentile(stage, 50),
+                "p95": self.latency.percentile(stage, 95),
+            }
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_s": _pcts("queue_wait"),
+            "hash_s": _pcts("hash"),
+            "verify_s": _pcts("verify"),
+        }
+
+
+password_pool = PasswordPool()
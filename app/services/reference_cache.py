@@ -0,0 +1,167 @@
+# app/services/reference_cache.py
+"""
+Read-through in-memory caches for reference data that almost never changes
+(judge question banks, case metadata).
+
+Lookups are served from memory. Entries expire after REFERENCE_CACHE_TTL_S,
+unless a change stream is open on the collection — then any change drops
+the cache and entries otherwise live until that happens. Change streams
+need a replica set; on a standalone server the watcher gives up and the
+TTL applies.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from app.database.mongodb import judge_questions_collection, cases_collection, moot_problems_collection
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_TTL_S = float(os.getenv("REFERENCE_CACHE_TTL_S", "300"))
+WATCH_RETRY_S = 60
+
+
+class CollectionVersion:
+    """
+    Change tracker for one collection: counts the writes seen on its change
+    stream and tells the caches built on it to drop their entries.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+        self.on_change: List[Callable[[], None]] = []
+        self.watching = False
+        self.changes = 0
+
+    def changed(self):
+        self.changes += 1
+        for callback in self.on_change:
+            callback()
+
+    async def watch(self):
+        """Mark the collection changed on every write; fall back to TTL if change streams are unavailable."""
+        while True:
+            try:
+                async with self.collection.watch() as stream:
+                    self.watching = True
+                    self.changed()  # anything read before the stream opened may be stale
+                    logger.info(f"[version:{self.name}] watching for changes")
+                    async for _change in stream:
+                        self.changed()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.info(f"[version:{self.name}] change stream unavailable ({e}); using TTLs")
+            finally:
+                self.watching = False
+            await asyncio.sleep(WATCH_RETRY_S)
+
+    def snapshot(self) -> dict:
+        return {
+            "changes": self.changes,
+            "mode": "change_stream" if self.watching else "ttl",
+        }
+
+
+class ReferenceCache:
+    def __init__(self, name: str, version: CollectionVersion, key_field: str, projection: dict,
+                 transform: Callable[[dict], dict] = lambda doc: doc,
+                 normalize: Callable[[str], str] = lambda key: key,
+                 ttl_s: float = REFERENCE_CACHE_TTL_S):
+        self.name = name
+        self.version = version
+        self.collection = version.collection
+        self.key_field = key_field
+        self.projection = projection
+        self.transform = transform
+        self.normalize = normalize
+        self.ttl_s = ttl_s
+        self._entries: Dict[str, Tuple[Optional[dict], float]] = {}
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        version.on_change.append(self.invalidate)
+
+    async def get(self, key: str) -> Optional[dict]:
+        key = self.normalize(key)
+        entry = self._entries.get(key)
+        if entry is not None and (self.version.watching or time.monotonic() - entry[1] < self.ttl_s):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return await self._flights.do(key, lambda: self._load(key))
+
+    async def _load(self, key: str) -> Optional[dict]:
+        doc = await self.collection.find_one({self.key_field: key}, self.projection)
+        value = self.transform(doc) if doc else None
+        # Misses are cached too — an unknown case_type shouldn't hit Mongo every turn
+        self._entries[key] = (value, time.monotonic())
+        return value
+
+    def invalidate(self):
+        self._entries.clear()
+        self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "mode": "change_stream" if self.version.watching else "ttl",
+        }
+
+
+def _case_meta(doc: dict) -> dict:
+    summary = doc.get("content", "")
+    # Trim to avoid bloating every request — first 2000 chars is enough context
+    if len(summary) > 2000:
+        summary = summary[:2000] + "...[truncated]"
+    return {"title": doc.get("title", ""), "summary": summary}
+
+
+judge_questions_version = CollectionVersion(judge_questions_collection)
+cases_version = CollectionVersion(cases_collection)
+moot_problems_version = CollectionVersion(moot_problems_collection)
+COLLECTION_VERSIONS = (judge_questions_version, cases_version, moot_problems_version)
+
+judge_question_banks = ReferenceCache(
+    "judge_questions", judge_questions_version, "case_type",
+    {"_id": 0, "questions": 1},
+    normalize=lambda case_type: (case_type or "").lower()
+)
+case_metadata = ReferenceCache(
+    "cases", cases_version, "id",
+    {"_id": 0, "title": 1, "content": 1},
+    transform=_case_meta
+)
+REFERENCE_CACHES = (judge_question_banks, case_metadata)
+
+_watchers = []
+
+
+def start_watchers():
+    for version in COLLECTION_VERSIONS:
+        _watchers.append(asyncio.ensure_future(version.watch()))
+
+
+def stop_watchers():
+    for task in _watchers:
+        task.cancel()
+    _watchers.clear()
+
+
+def reference_cache_stats() -> dict:
+    return {
+        "caches": {cache.name: cache.snapshot() for cache in REFERENCE_CACHES},
+        "versions": {version.name: version.snapshot() for version in COLLECTION_VERSIONS},
+    }
@@ -0,0 +1,88 @@
+# app/services/revocation.py
+"""
+Revoked token ids (jti), mirrored in memory.
+
+Access tokens are verified without touching Mongo; the only per-request
+check is this in-memory set. It is reloaded from `revoked_tokens` every
+REVOCATION_REFRESH_S, so a revocation made by another worker takes effect
+within that window (revocations made here apply at once). Entries expire
+with their token via a TTL index, which keeps the set small.
+
+A reload merges into the set rather than replacing it, so a revocation
+made here while the reload query was running is not lost. claim() is
+the single-use check for refresh tokens: the insert into revoked_tokens
+succeeds for exactly one caller per jti.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb import revoked_tokens_collection
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_REFRESH_S = float(os.getenv("REVOCATION_REFRESH_S", "30"))
+
+
+class RevocationList:
+    def __init__(self, refresh_s: float = REVOCATION_REFRESH_S):
+        self.refresh_s = refresh_s
+        self._revoked: Dict[str, datetime] = {}
+        self._loaded_at = float("-inf")
+        self._reloads = SingleFlight()
+        self.checks = 0
+        self.reloads = 0
+
+    async def _reload(self):
+        now = datetime.utcnow()
+        loaded = {}
+        async for doc in revoked_tokens_collection.find({"expires_at": {"$gt": now}}, {"expires_at": 1}):
+            loaded[doc["_id"]] = doc["expires_at"]
+        # Keep local entries the query may have missed; only expiry drops one
+        revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        revoked.update(loaded)
+        self._revoked = revoked
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() - self._loaded_at > self.refresh_s:
+            try:
+                await self._reloads.do("reload", self._reload)
+            except Exception as e:
+                # Serve the last known list rather than failing every request
+                logger.warning(f"[revocation] reload failed: {e}")
+        self.checks += 1
+        return jti in self._revoked
+
+    async def revoke(self, jti: str, expires_at: datetime):
+        self._revoked[jti] = expires_at
+        await revoked_tokens_collection.update_one(
+            {"_id": jti}, {"$set": {"expires_at": expires_at}}, upsert=True
+        )
+
+    async def claim(self, jti: str, expires_at: datetime) -> bool:
+        """Revoke jti; True only for the one caller whose insert created the entry."""
+        try:
+            await revoked_tokens_collection.insert_one({"_id": jti, "expires_at": expires_at})
+        except DuplicateKeyError:
+            self._revoked[jti] = expires_at
+            return False
+        self._revoked[jti] = expires_at
+        return True
+
+    def snapshot(self) -> dict:
+        return {
+            "entries": len(self._revoked),
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "age_s": round(time.monotonic() - self._loaded_at, 1) if self.reloads else None,
+        }
+
+
+revocation_list = RevocationList()
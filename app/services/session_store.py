@@ -0,0 +1,226 @@
+# app/services/session_store.py
+"""
+Typed, projected reads of live_sessions.
+
+A session document carries the whole transcript (and, for sessions from
+before GridFS, inline base64 audio in history[].audio), so no route loads
+it whole. Each accessor asks for exactly the fields its callers use:
+
+    get_session_state    — turn state machine only (every petitioner step)
+    get_session_history  — state + case context + history entries, optionally
+                           just the last N; legacy inline audio only when
+                           asked for (the transcript)
+    list_session_summaries — a page of dashboard rows, newest first, with
+                           only the latest evaluation
+
+Transcript entries live outside the session, in `session_turns`: one
+document per TURN_BUCKET_SIZE entries of a session, {session_id, bucket}
+unique. The session keeps the state machine and a turn_count that
+numbers the entries. Sessions from before the buckets still have their
+`history` array; reads return it ahead of any bucketed entries.
+
+A turn's entries are first written into the session itself, in
+`pending_turns`, by the same update that advances the state, so a turn
+is never recorded without its transcript. flush_pending() then copies
+them into their buckets (idempotently) and pulls them from the session;
+if that fails, the next history read flushes them, and merges whatever
+is still pending.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple, TypedDict
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb import live_sessions_collection, session_turns_collection
+
+logger = logging.getLogger(__name__)
+
+TURN_BUCKET_SIZE = int(os.getenv("TURN_BUCKET_SIZE", "50"))
+
+STATE_FIELDS = ("next_turn", "current_party", "case_id", "case_type", "turn_count")
+CONTEXT_FIELDS = ("case_title", "case_summary", "original_petitioner_argument")
+# Everything a history entry holds except the legacy inline `audio` blob (LEGACY_AUDIO_FIELD)
+HISTORY_ENTRY_FIELDS = ("role", "text", "type", "timestamp",
+                        "audio_id", "audio_mime", "audio_size", "audio_duration", "audio_deferred",
+                        "audio_parts")
+LEGACY_AUDIO_FIELD = "audio"  # base64 clip on entries stored before GridFS
+SUMMARY_FIELDS = ("case_id", "case_type", "case_title", "next_turn", "current_party",
+                  "created_at", "updated_at")
+
+
+class SessionState(TypedDict, total=False):
+    _id: ObjectId
+    next_turn: str
+    current_party: Optional[str]
+    case_id: str
+    case_type: str
+    turn_count: int
+
+
+class HistoryEntry(TypedDict, total=False):
+    seq: int
+    role: str
+    text: str
+    type: str
+    timestamp: datetime
+    audio_id: str
+    audio_mime: str
+    audio_size: int
+    audio_duration: float
+    audio_deferred: bool
+    audio_parts: List[dict]
+    audio: str  # legacy base64
+
+
+class SessionHistory(SessionState, total=False):
+    case_title: str
+    case_summary: str
+    original_petitioner_argument: Optional[str]
+    history: List[HistoryEntry]
+    evaluation_history: List[dict]
+
+
+class SessionSummary(TypedDict, total=False):
+    _id: ObjectId
+    case_id: str
+    case_type: str
+    case_title: str
+    next_turn: str
+    current_party: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    evaluation_history: List[dict]  # the latest entry only
+
+
+def _owned(session_id: str, user_id) -> dict:
+    return {"_id": ObjectId(session_id), "user_id": user_id}
+
+
+async def get_session_state(session_id: str, user_id) -> SessionState:
+    session = await live_sessions_collection.find_one(
+        _owned(session_id, user_id), {field: 1 for field in STATE_FIELDS}
+    )
+    if not session:
+        raise HTTPException(404, "Session not found")
+    return session
+
+
+async def get_session_history(session_id: str, user_id, last: Optional[int] = None,
+                              evaluations: bool = False, inline_audio: bool = False) -> SessionHistory:
+    """
+    inline_audio keeps the base64 `audio` of legacy entries, for callers
+    that hand audio to the client; the LLM paths only need the text.
+    """
+    legacy = {"$ifNull": ["$history", []]}
+    if last:
+        legacy = {"$slice": [legacy, -last]}
+    entry_fields = HISTORY_ENTRY_FIELDS + ((LEGACY_AUDIO_FIELD,) if inline_audio else ())
+    project = {
+        **{field: 1 for field in STATE_FIELDS + CONTEXT_FIELDS},
+        # $map rebuilds each entry from the listed fields; missing ones stay missing
+        "history": {"$map": {"input": legacy, "as": "h",
+                             "in": {field: f"$$h.{field}" for field in entry_fields}}},
+    }
+    project["pending_turns"] = 1
+    if evaluations:
+        project["evaluation_history"] = 1
+    docs = await live_sessions_collection.aggregate([
+        {"$match": _owned(session_id, user_id)},
+        {"$project": project},
+    ]).to_list(length=1)
+    if not docs:
+        raise HTTPException(404, "Session not found")
+    session = docs[0]
+    pending = session.pop("pending_turns", None) or []
+    if pending:
+        try:
+            await flush_pending(session["_id"], pending)
+        except Exception as e:
+            logger.warning(f"[session_turns] flush of {len(pending)} pending entries for {session_id} failed: {e}")
+    bucketed = await load_turns(session["_id"], last)
+    stored = {entry.get("seq") for entry in bucketed}
+    bucketed += [entry for entry in pending if entry["seq"] not in stored]
+    bucketed.sort(key=lambda entry: entry.get("seq", 0))
+    history = session["history"] + bucketed
+    session["history"] = history[-last:] if last else history
+    return session
+
+
+# ================= TRANSCRIPT BUCKETS =================
+def number_turns(first_seq: int, entries: List[HistoryEntry]) -> List[HistoryEntry]:
+    return [{**entry, "seq": first_seq + offset} for offset, entry in enumerate(entries)]
+
+
+async def append_turns(session_id: ObjectId, entries: List[HistoryEntry]):
+    """
+    Store numbered entries (see number_turns) in their buckets. Callers own
+    the numbers (advance_turn reserves them with turn_count), so appends
+    never collide; $sort keeps a bucket in order if two steps' appends
+    land out of order. Each bucket's share is pushed in one update that
+    only matches while its first seq is absent, so re-appending the same
+    entries (a retried flush) is a no-op.
+    """
+    parts = {}
+    for entry in entries:
+        parts.setdefault(entry["seq"] // TURN_BUCKET_SIZE, []).append(entry)
+    now = datetime.utcnow()
+    for bucket, part in parts.items():
+        query = {"session_id": session_id, "bucket": bucket, "entries.seq": {"$ne": part[0]["seq"]}}
+        update = {
+            "$push": {"entries": {"$each": part, "$sort": {"seq": 1}}},
+            "$inc": {"count": len(part)},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"created_at": now},
+        }
+        try:
+            await session_turns_collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # The bucket exists: a new one was created concurrently, or it
+            # already holds these entries and the upsert didn't match
+            await session_turns_collection.update_one(query, update)
+
+
+async def flush_pending(session_id: ObjectId, entries: List[HistoryEntry]):
+    """Move entries from the session's pending_turns into their buckets."""
+    await append_turns(session_id, entries)
+    await live_sessions_collection.update_one(
+        {"_id": session_id},
+        {"$pull": {"pending_turns": {"seq": {"$in": [entry["seq"] for entry in entries]}}}}
+    )
+
+
+async def load_turns(session_id: ObjectId, last: Optional[int] = None) -> List[HistoryEntry]:
+    """A session's bucketed entries in order; with `last`, only the buckets needed for them."""
+    buckets, total = [], 0
+    cursor = session_turns_collection.find(
+        {"session_id": session_id}, {"_id": 0, "entries": 1}
+    ).sort("bucket", -1)
+    async for doc in cursor:
+        buckets.append(doc["entries"])
+        total += len(doc["entries"])
+        if last and total >= last:
+            break
+    entries = [entry for bucket in reversed(buckets) for entry in bucket]
+    return entries[-last:] if last else entries
+
+
+async def list_session_summaries(user_id, limit: int = 100,
+                                 cursor: Optional[str] = None) -> Tuple[List[SessionSummary], Optional[str]]:
+    """
+    Keyset page on {user_id, _id desc} — ObjectIds follow insertion order,
+    so this is newest first. The cursor is the last session id of the
+    previous page.
+    """
+    query = {"user_id": user_id}
+    if cursor:
+        query["_id"] = {"$lt": ObjectId(cursor)}
+    projection = {field: 1 for field in SUMMARY_FIELDS}
+    projection["evaluation_history"] = {"$slice": -1}
+    docs = await live_sessions_collection.find(query, projection).sort("_id", -1) \
+        .limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
@@ -0,0 +1,60 @@
+# app/services/singleflight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Collapses concurrent requests for the same key onto one computation.
+
+    The first caller for a key leads; everyone arriving while it runs
+    awaits the same future. Results are not kept once the flight lands —
+    persistence is the caller's job.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.led = 0
+        self.joined = 0
+
+    def join_or_lead(self, key: str) -> Tuple[asyncio.Future, bool]:
+        """Return (future, is_leader). The leader must call land() when done."""
+        fut = self._flights.get(key)
+        if fut is not None:
+            self.joined += 1
+            return fut, False
+        fut = asyncio.get_running_loop().create_future()
+        self._flights[key] = fut
+        self.led += 1
+        return fut, True
+
+    def land(self, key: str, result=None, error: BaseException = None):
+        fut = self._flights.pop(key, None)
+        if fut is None or fut.done():
+            return
+        if error is not None:
+            fut.set_exception(error)
+            # Mark retrieved so a flight nobody joined doesn't warn
+            fut.exception()
+        else:
+            fut.set_result(result)
+
+    async def do(self, key: str, make_coro: Callable[[], Awaitable]):
+        fut, leader = self.join_or_lead(key)
+        if leader:
+            task = asyncio.ensure_future(make_coro())
+
+            def _done(t: asyncio.Task):
+                if t.cancelled():
+                    self.land(key, error=asyncio.CancelledError())
+                elif t.exception() is not None:
+                    self.land(key, error=t.exception())
+                else:
+                    self.land(key, result=t.result())
+
+            task.add_done_callback(_done)
+        # shield: one caller disconnecting must not cancel the shared work
+        return await asyncio.shield(fut)
+
+    def snapshot(self) -> dict:
+        return {"in_flight": len(self._flights), "led": self.led, "joined": self.joined}
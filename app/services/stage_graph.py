@@ -0,0 +1,77 @@
+# app/services/stage_graph.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """
+    Runs one hearing turn as a small dependency graph of async stages.
+
+    Each stage is started as soon as the stages it depends on have finished,
+    so independent work (RAG, judge question lookup, TTS) overlaps instead of
+    running back to back. The caller still decides the order in which results
+    are consumed, so SSE events keep their order.
+
+    Usage:
+        g = StageGraph("respondent")
+        g.add("arg", lambda: run_rag())
+        g.add("arg_audio", lambda arg: tts(arg), deps=["arg"])
+        g.start()
+        text = await g.result("arg")
+    """
+
+    def __init__(self, name: str = "turn"):
+        self.name = name
+        self._stages: Dict[str, tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.timings: Dict[str, float] = {}
+        self._started_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[..., Awaitable], deps: Iterable[str] = ()) -> "StageGraph":
+        """Register a stage. `fn` receives each dependency's result as a keyword argument."""
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def start(self) -> "StageGraph":
+        self._started_at = time.perf_counter()
+        for name in self._stages:
+            self._schedule(name)
+        return self
+
+    def _schedule(self, name: str) -> asyncio.Task:
+        if name in self._tasks:
+            return self._tasks[name]
+        fn, deps = self._stages[name]
+        dep_tasks = {d: self._schedule(d) for d in deps}
+
+        async def _run():
+            kwargs = {d: await t for d, t in dep_tasks.items()}
+            t0 = time.perf_counter()
+            try:
+                return await fn(**kwargs)
+            finally:
+                self.timings[name] = round(time.perf_counter() - t0, 3)
+
+        task = asyncio.create_task(_run(), name=f"{self.name}:{name}")
+        self._tasks[name] = task
+        return task
+
+    async def result(self, name: str):
+        return await self._tasks[name]
+
+    def elapsed(self) -> float:
+        if self._started_at is None:
+            return 0.0
+        return time.perf_counter() - self._started_at
+
+    def cancel(self):
+        """Cancel unfinished stages and swallow errors nobody consumed."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
@@ -0,0 +1,95 @@
+# app/services/stream_stt.py
+"""
+Incremental transcription of a live recording.
+
+PCM is buffered as it arrives. Whenever the VAD finds a pause (or the
+buffer reaches VAD_MAX_SEGMENT_S) the audio up to that pause is queued
+for the STT pool and its text is reported as a partial, so when the
+speaker stops only the last few seconds are left to decode.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from app.services.stt_pool import stt_pool, STTOverloaded
+from app.services.transcode import AudioTooLarge, BYTES_PER_SECOND, RECORDING_MAX_S
+from rag.moot_rag.audio.vad import detect_speech, find_cut, vad_stats
+
+logger = logging.getLogger(__name__)
+
+CUT_CHECK_BYTES = BYTES_PER_SECOND // 2  # look for a pause every 0.5s of new audio
+STT_OVERLOAD_RETRIES = 3
+
+
+class StreamingRecognizer:
+    def __init__(self, on_partial: Callable[[int, str, str], Awaitable[None]],
+                 max_seconds: float = RECORDING_MAX_S):
+        self.on_partial = on_partial
+        self.max_bytes = int(max_seconds * BYTES_PER_SECOND)
+        self.pcm = bytearray()       # the whole recording
+        self._pending = bytearray()  # not yet handed to the decoder
+        self._since_check = 0
+        self._windows: asyncio.Queue = asyncio.Queue()
+        self._texts: List[str] = []
+        self._decoder: Optional[asyncio.Task] = None
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self._texts)
+
+    def start(self) -> "StreamingRecognizer":
+        self._decoder = asyncio.ensure_future(self._decode_loop())
+        return self
+
+    def add_pcm(self, chunk: bytes):
+        if len(self.pcm) + len(chunk) > self.max_bytes:
+            raise AudioTooLarge(f"Recording exceeds {self.max_bytes / BYTES_PER_SECOND:.0f}s")
+        self.pcm.extend(chunk)
+        self._pending.extend(chunk)
+        self._since_check += len(chunk)
+        if self._since_check < CUT_CHECK_BYTES:
+            return
+        self._since_check = 0
+        cut = find_cut(bytes(self._pending[:len(self._pending) // 2 * 2]))
+        if cut:
+            self._windows.put_nowait(bytes(self._pending[:cut]))
+            del self._pending[:cut]
+
+    async def _transcribe(self, segments: List[bytes]) -> str:
+        for attempt in range(STT_OVERLOAD_RETRIES + 1):
+            try:
+                return (await stt_pool.transcribe(*segments)).strip()
+            except STTOverloaded as e:
+                if attempt == STT_OVERLOAD_RETRIES:
+                    raise
+                await asyncio.sleep(min(e.retry_after, 2))
+
+    async def _decode_loop(self):
+        seq = 0
+        while True:
+            window = await self._windows.get()
+            if window is None:
+                return
+            vad = await asyncio.to_thread(detect_speech, window)
+            vad_stats.record(vad)
+            if not vad.has_speech:
+                continue
+            text = await self._transcribe(vad.segments)
+            if text:
+                self._texts.append(text)
+                await self.on_partial(seq, text, self.transcript)
+                seq += 1
+
+    async def finish(self) -> str:
+        """Decode whatever is still buffered and return the full transcript."""
+        tail = bytes(self._pending[:len(self._pending) // 2 * 2])
+        self._pending.clear()
+        if tail:
+            self._windows.put_nowait(tail)
+        self._windows.put_nowait(None)
+        await self._decoder
+        return self.transcript
+
+    def cancel(self):
+        if self._decoder is not None:
+            self._decoder.cancel()
@@ -0,0 +1,211 @@
+# app/services/stt_pool.py
+"""
+Whisper in a dedicated process pool.
+
+Decoding no longer shares the default thread pool (and the GIL) with the
+API: each worker process loads the model once in its initializer and then
+only decodes. Admission is bounded — once every worker is busy and
+STT_QUEUE_MAX jobs are waiting, new jobs are refused straight away with
+their would-be queue position instead of piling up.
+
+A worker that dies (OOM kill, native crash in the decoder) breaks the
+whole ProcessPoolExecutor. The pool is then rebuilt once, its workers are
+warmed up again, and the failed job is retried a single time.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.services.deadlines import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+STT_WORKERS = max(1, int(os.getenv("STT_WORKERS", "1")))
+STT_QUEUE_MAX = int(os.getenv("STT_QUEUE_MAX", "8"))
+STT_JOB_TIMEOUT_S = float(os.getenv("STT_JOB_TIMEOUT_S", "60"))
+
+
+class STTOverloaded(Exception):
+    def __init__(self, position: int, retry_after: int):
+        super().__init__(f"STT queue full (position {position})")
+        self.position = position
+        self.retry_after = retry_after
+
+
+class STTTimeout(Exception):
+    pass
+
+
+class STTUnavailable(Exception):
+    """The worker pool broke again while retrying a job after a rebuild."""
+
+
+# ================= WORKER PROCESS =================
+def _init_worker():
+    from rag.moot_rag.audio.stt import get_engine
+    get_engine().load()
+
+
+def _warm_up_job() -> int:
+    return os.getpid()
+
+
+def _transcribe_job(segments: Tuple[bytes, ...], deadline: float):
+    """Runs in a worker. Returns (text, started_at, decode_s); text is None if the job expired while queued."""
+    from rag.moot_rag.audio.stt import pcm_to_text
+    started = time.time()
+    if started > deadline:
+        return None, started, 0.0
+    t0 = time.perf_counter()
+    text = " ".join(t for t in (pcm_to_text(pcm) for pcm in segments) if t)
+    return text, started, time.perf_counter() - t0
+
+
+# ================= POOL =================
+class STTPool:
+    def __init__(self, workers: int = STT_WORKERS, max_queue: int = STT_QUEUE_MAX,
+                 timeout: float = STT_JOB_TIMEOUT_S):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0  # admitted and not yet finished in a worker
+        self._warming: Optional[asyncio.Future] = None
+        self.latency = StageMetrics()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.expired = 0
+        self.restarts = 0
+        self.audio_s = 0.0
+        self.decode_s = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already holds torch / motor state is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._executor
+
+    def _retry_after(self, position: int) -> int:
+        decode_p50 = self.latency.percentile("decode", 50) or 5.0
+        return max(1, math.ceil(position * decode_p50 / self.workers))
+
+    def _release(self):
+        self._pending -= 1
+
+    async def _warm_up(self):
+        """One trivial job per worker, so every initializer has loaded the model."""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(
+                loop.run_in_executor(executor, _warm_up_job) for _ in range(self.workers)
+            )), self.timeout)
+        except Exception as e:
+            logger.warning(f"[STTPool] warm-up after restart failed: {e}")
+
+    async def _recover(self, broken: ProcessPoolExecutor):
+        """Replace a broken executor; concurrent callers share one rebuild."""
+        if self._executor is broken:
+            self._executor = None
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+            logger.warning(f"[STTPool] worker process died, restarting pool (restart #{self.restarts})")
+            self._warming = asyncio.ensure_future(self._warm_up())
+        if self._warming is not None:
+            await asyncio.shield(self._warming)
+
+    async def _run(self, executor: ProcessPoolExecutor, segments: Tuple[bytes, ...]):
+        submitted = time.time()
+        cfut = executor.submit(_transcribe_job, segments, submitted + self.timeout)
+        self._pending += 1
+        # Slot is freed when the worker is done, not when the caller gives up
+        loop = asyncio.get_running_loop()
+        cfut.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release))
+
+        try:
+            text, started, decode_s = await asyncio.wait_for(asyncio.wrap_future(cfut), self.timeout)
+        except asyncio.TimeoutError:
+            # A queued job is dropped by its deadline; a running decode cannot be interrupted
+            self.timed_out += 1
+            raise STTTimeout(f"Transcription did not finish within {self.timeout}s")
+        self.latency.record("queue_wait", max(0.0, started - submitted))
+        return text, decode_s
+
+    async def transcribe(self, *segments: bytes) -> str:
+        """
+        Transcribe one or more 16 kHz s16le PCM segments as a single job;
+        segment texts are joined in order.
+
+        Raises:
+            STTOverloaded: every worker busy and the queue is full.
+            STTTimeout:    the job did not finish within the per-job timeout.
+            STTUnavailable: a worker died, and the retry on a rebuilt pool failed too.
+        """
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            position = self._pending - self.workers + 1
+            raise STTOverloaded(position, self._retry_after(position))
+
+        executor = self._get_executor()
+        try:
+            text, decode_s = await self._run(executor, segments)
+        except BrokenProcessPool:
+            await self._recover(executor)
+            executor = self._get_executor()
+            try:
+                text, decode_s = await self._run(executor, segments)
+            except BrokenProcessPool as e:
+                await self._recover(executor)
+                raise STTUnavailable("Transcription worker crashed") from e
+
+        if text is None:
+            self.expired += 1
+            raise STTTimeout("Transcription expired in the queue")
+        self.latency.record("decode", decode_s)
+        self.completed += 1
+        self.audio_s += sum(len(pcm) for pcm in segments) / 32000
+        self.decode_s += decode_s
+        return text
+
+    def rtf(self) -> Optional[float]:
+        """Observed decode seconds per second of audio."""
+        return self.decode_s / self.audio_s if self.audio_s else None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        def _pcts(stage: str) -> dict:
+            return {
+                "p50": self.latency.percentile(stage, 50),
+                "p95": self.latency.percentile(stage, 95),
+            }
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "expired": self.expired,
+            "restarts": self.restarts,
+            "queue_wait_s": _pcts("queue_wait"),
+            "decode_s": _pcts("decode"),
+            "rtf": round(self.rtf(), 4) if self.audio_s else None,
+        }
+
+
+stt_pool = STTPool()
@@ -0,0 +1,68 @@
+# app/services/thread_stream.py
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iter: Callable[[], Iterable],
+                            deadline: Optional[float] = None,
+                            run_blocking: Optional[Callable[..., Awaitable]] = None) -> AsyncIterator:
+    """
+    Drive a blocking iterator (e.g. a Groq stream) in a worker thread and
+    yield its items on the event loop as they arrive.
+
+    deadline is a time.monotonic() instant; past it the next wait raises
+    asyncio.TimeoutError. When the consumer stops early (deadline, error,
+    or the generator being closed on client disconnect) the producer is
+    told to stop: it closes its iterator before pulling the next item, so
+    the upstream request is dropped instead of being read to the end.
+
+    run_blocking(fn) runs the producer on another pool (e.g. a queue's own
+    threads and permits) instead of the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _emit(item):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def _worker():
+        iterator = iter(make_iter())
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                _emit(item)
+        except Exception as e:
+            _emit(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            _emit(_DONE)
+
+    if run_blocking is None:
+        worker = loop.run_in_executor(None, _worker)
+    else:
+        worker = asyncio.ensure_future(run_blocking(_worker))
+    try:
+        while True:
+            if deadline is None:
+                item = await queue.get()
+            else:
+                item = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.monotonic()))
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await worker
+    finally:
+        stop.set()
+        if not worker.done():
+            worker.cancel()  # still waiting for a thread: never start; a running one stops on `stop`
@@ -0,0 +1,276 @@
+# app/services/transcode.py
+"""
+Non-blocking upload -> 16 kHz mono PCM transcoding.
+
+ffmpeg runs as an asyncio subprocess: the upload is fed to its stdin in
+chunks while stdout is drained concurrently, so the event loop keeps
+serving other hearings for the whole transcode. Uploads over the size
+limit or recordings over the duration limit are cut off as soon as they
+cross it, and at most FFMPEG_MAX_CONCURRENCY transcodes run at once.
+PCMStream does the same for a live recording that arrives in chunks. It
+holds a slot for the whole recording (up to RECORDING_MAX_S), so live
+streams draw from their own FFMPEG_LIVE_MAX_CONCURRENCY slots and never
+starve uploads. Waiting for a slot is bounded by FFMPEG_SLOT_WAIT_S;
+past that the caller gets TranscoderBusy.
+"""
+import asyncio
+import io
+import logging
+import os
+import wave
+import weakref
+from typing import Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_TIMEOUT_S = float(os.getenv("FFMPEG_TIMEOUT_S", "30"))
+FFMPEG_MAX_CONCURRENCY = int(os.getenv("FFMPEG_MAX_CONCURRENCY", "2"))
+FFMPEG_LIVE_MAX_CONCURRENCY = int(os.getenv("FFMPEG_LIVE_MAX_CONCURRENCY", "4"))
+FFMPEG_SLOT_WAIT_S = float(os.getenv("FFMPEG_SLOT_WAIT_S", "10"))
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "20")) * 1024 * 1024)
+RECORDING_MAX_S = float(os.getenv("RECORDING_MAX_S", "600"))
+PIPE_CHUNK = 64 * 1024
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # mono s16le
+
+FFMPEG_CMD = [
+    "ffmpeg", "-nostdin", "-loglevel", "error",
+    "-i", "pipe:0",
+    "-ac", "1",
+    "-ar", str(SAMPLE_RATE),
+    "-f", "s16le",
+    "pipe:1"
+]
+
+
+class TranscodeError(Exception):
+    """ffmpeg failed or timed out. `source` holds whatever was uploaded."""
+
+    def __init__(self, message: str, source: bytes = b""):
+        super().__init__(message)
+        self.source = source
+
+
+class AudioTooLarge(TranscodeError):
+    pass
+
+
+class TranscoderBusy(Exception):
+    """No ffmpeg slot freed up in time; nothing was transcoded, retry later."""
+
+    def __init__(self, wait_s: float):
+        super().__init__(f"No transcoder free within {wait_s:g}s")
+        self.retry_after = max(1, round(wait_s))
+
+
+class Transcoded(NamedTuple):
+    source: bytes  # the upload as received
+    pcm: bytes     # 16 kHz mono s16le
+
+    @property
+    def duration(self) -> float:
+        return round(len(self.pcm) / BYTES_PER_SECOND, 2)
+
+    def wav(self) -> io.BytesIO:
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(self.pcm)
+        buf.seek(0)
+        return buf
+
+
+_limits: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _limit(live: bool = False) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sems = _limits.get(loop)
+    if sems is None:
+        sems = _limits[loop] = {
+            False: asyncio.Semaphore(FFMPEG_MAX_CONCURRENCY),
+            True: asyncio.Semaphore(FFMPEG_LIVE_MAX_CONCURRENCY),
+        }
+    return sems[live]
+
+
+async def _acquire(sem: asyncio.Semaphore, wait_s: float):
+    try:
+        await asyncio.wait_for(sem.acquire(), wait_s)
+    except asyncio.TimeoutError:
+        raise TranscoderBusy(wait_s)
+
+
+async def transcode_upload(file, timeout: float = FFMPEG_TIMEOUT_S,
+                           max_bytes: int = UPLOAD_MAX_BYTES,
+                           max_seconds: float = RECORDING_MAX_S,
+                           slot_wait_s: float = FFMPEG_SLOT_WAIT_S) -> Transcoded:
+    """
+    Transcode an UploadFile (anything with `async read(n)`) to PCM.
+
+    Raises:
+        TranscoderBusy: no transcode slot within slot_wait_s.
+        AudioTooLarge:  upload over max_bytes or audio over max_seconds.
+        TranscodeError: ffmpeg failed, or did not finish within `timeout`.
+    """
+    source = bytearray()
+    pcm = bytearray()
+    max_pcm = int(max_seconds * BYTES_PER_SECOND)
+
+    sem = _limit()
+    await _acquire(sem, slot_wait_s)
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *FFMPEG_CMD,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        async def feed():
+            try:
+                while True:
+                    chunk = await file.read(PIPE_CHUNK)
+                    if not chunk:
+                        break
+                    source.extend(chunk)
+                    if len(source) > max_bytes:
+                        raise AudioTooLarge(f"Upload exceeds {max_bytes / (1024 * 1024):.1f} MB")
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg exited early; its exit code tells us why
+            finally:
+                if not proc.stdin.is_closing():
+                    proc.stdin.close()
+
+        async def read_pcm():
+            while True:
+                chunk = await proc.stdout.read(PIPE_CHUNK)
+                if not chunk:
+                    break
+                pcm.extend(chunk)
+                if len(pcm) > max_pcm:
+                    raise AudioTooLarge(f"Recording exceeds {max_seconds:.0f}s")
+
+        tasks = [
+            asyncio.ensure_future(feed()),
+            asyncio.ensure_future(read_pcm()),
+            asyncio.ensure_future(proc.stderr.read()),
+        ]
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+            returncode = await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TranscodeError(f"ffmpeg timed out after {timeout}s", bytes(source))
+        except AudioTooLarge as e:
+            e.source = bytes(source)
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+    finally:
+        sem.release()
+
+    if returncode != 0:
+        stderr = tasks[2].result().decode(errors="replace").strip()
+        raise TranscodeError(f"ffmpeg exited with {returncode}: {stderr[-500:]}", bytes(source))
+    return Transcoded(bytes(source), bytes(pcm))
+
+
+class PCMStream:
+    """
+    One long-lived ffmpeg for a live recording. Container chunks (e.g.
+    MediaRecorder webm) go in through write(); PCM is handed to `on_pcm`
+    as soon as ffmpeg produces it. close() flushes the tail; reap() must
+    run in every case to end the process and free the concurrency slot.
+    """
+
+    def __init__(self, on_pcm: Callable[[bytes], None]):
+        self.on_pcm = on_pcm
+        self._proc = None
+        self._reader = None
+        self._slot = None
+
+    async def start(self, slot_wait_s: float = FFMPEG_SLOT_WAIT_S) -> "PCMStream":
+        """
+        Raises:
+            TranscoderBusy: no live-stream slot freed up within slot_wait_s.
+        """
+        sem = _limit(live=True)
+        await _acquire(sem, slot_wait_s)
+        self._slot = sem
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *FFMPEG_CMD,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except BaseException:
+            self._release()
+            raise
+        self._reader = asyncio.ensure_future(self._read())
+        return self
+
+    def _release(self):
+        if self._slot is not None:
+            self._slot.release()
+            self._slot = None
+
+    async def _read(self):
+        try:
+            while True:
+                chunk = await self._proc.stdout.read(PIPE_CHUNK)
+                if not chunk:
+                    break
+                self.on_pcm(chunk)
+        except Exception:
+            # e.g. on_pcm hit a limit: stop ffmpeg so write() fails fast
+            self._proc.kill()
+            raise
+
+    def _raise_reader_error(self):
+        if self._reader.done() and not self._reader.cancelled() and self._reader.exception():
+            raise self._reader.exception()
+
+    async def write(self, chunk: bytes):
+        self._raise_reader_error()
+        try:
+            self._proc.stdin.write(chunk)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            self._raise_reader_error()
+            raise TranscodeError("ffmpeg stopped accepting audio")
+
+    async def close(self, timeout: float = FFMPEG_TIMEOUT_S):
+        if not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+        try:
+            await asyncio.wait_for(self._reader, timeout)
+            await asyncio.wait_for(self._proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TranscodeError(f"ffmpeg did not flush within {timeout}s")
+        finally:
+            self.kill()
+
+    def kill(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+
+    async def reap(self):
+        """Kill ffmpeg if still running, wait for it to exit and free the slot."""
+        try:
+            self.kill()
+            if self._proc is not None:
+                await self._proc.wait()
+        finally:
+            self._release()
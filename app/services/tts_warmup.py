@@ -0,0 +1,69 @@
+"""
+Pre-synthesize the judge-question bank into the TTS cache
+File: app/services/tts_warmup.py
+Run: python -m app.services.tts_warmup [--voices judge,default] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.database.mongodb import judge_questions_collection
+from rag.moot_rag.audio.tts import synthesize, get_engine
+from rag.moot_rag.audio.tts_cache import tts_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_judge_questions(voices: list, concurrency: int = 4) -> dict:
+    questions = set()
+    async for doc in judge_questions_collection.find({}, {"questions": 1}):
+        for q in doc.get("questions") or []:
+            if isinstance(q, str) and q.strip():
+                questions.add(q)
+
+    sem = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    async def _one(text: str, voice: str):
+        nonlocal failed
+        async with sem:
+            try:
+                await synthesize(text, voice)
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Warm-up failed for voice={voice}: {e}")
+
+    hits_before = tts_cache.hits
+    await asyncio.gather(*(_one(q, v) for q in questions for v in voices))
+    return {
+        "questions": len(questions),
+        "clips": len(questions) * len(voices),
+        "already_cached": tts_cache.hits - hits_before,
+        "failed": failed,
+        "cache": tts_cache.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-synthesize judge questions into the TTS cache")
+    parser.add_argument("--voices", default="judge", help="comma-separated voice roles")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    voices = [v.strip() for v in args.voices.split(",") if v.strip()]
+
+    async def _run():
+        try:
+            return await warm_judge_questions(voices, args.concurrency)
+        finally:
+            await get_engine().close()
+
+    report = asyncio.run(_run())
+    print(f"Warmed {report['clips']} clips for {report['questions']} questions "
+          f"({report['already_cached']} already cached, {report['failed']} failed)")
+    print(f"Cache: {report['cache']}")
+
+
+if __name__ == "__main__":
+    main()
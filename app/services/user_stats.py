@@ -0,0 +1,139 @@
+# app/services/user_stats.py
+"""
+Per-user performance summary, maintained on write.
+
+One `user_stats` document per user (_id = user id) holds the number of
+evaluated sessions, a running sum/count per rubric category and the
+latest USER_STATS_RECENT session summaries. Each completed evaluation
+folds into it with a single update_one ($inc + capped $push), so the
+dashboard reads one small document instead of walking every session.
+
+Only a session's first evaluation counts; re-evaluations after a rubric
+or model change don't double-count it. rebuild() recomputes a user's
+document from their sessions (backfill, or repair after a lost write):
+    python -m app.services.user_stats [--user <id>]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict
+
+from bson import ObjectId
+
+from app.database.mongodb import user_stats_collection, live_sessions_collection, users_collection
+from eval_rag.evaluator.rubric import RUBRIC_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_RECENT = int(os.getenv("USER_STATS_RECENT", "10"))
+
+
+def rubric_key(category: str) -> str:
+    """'Organization & Clarity' -> 'organization_clarity' (safe as a Mongo field name)."""
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")
+
+
+def rubric_scores(evaluation: dict) -> Dict[str, float]:
+    scores = {}
+    for category, block in (evaluation.get("scores") or {}).items():
+        score = block.get("score") if isinstance(block, dict) else None
+        if isinstance(score, (int, float)) and not isinstance(score, bool):
+            scores[rubric_key(category)] = float(score)
+    return scores
+
+
+def session_summary(session: dict, evaluation: dict, evaluated_at: datetime) -> dict:
+    scores = rubric_scores(evaluation)
+    return {
+        "session_id": str(session["_id"]),
+        "case_id": session.get("case_id"),
+        "case_title": session.get("case_title"),
+        "case_type": session.get("case_type"),
+        "total_score": sum(scores.values()) if scores else None,
+        "scores": scores,
+        "evaluated_at": evaluated_at,
+    }
+
+
+async def record_evaluation(user_id, session: dict, evaluation: dict, evaluated_at: datetime):
+    summary = session_summary(session, evaluation, evaluated_at)
+    inc = {"sessions_evaluated": 1}
+    for key, score in summary["scores"].items():
+        inc[f"rubric.{key}.sum"] = score
+        inc[f"rubric.{key}.count"] = 1
+    await user_stats_collection.update_one(
+        {"_id": user_id},
+        {
+            "$inc": inc,
+            "$set": {"updated_at": datetime.utcnow()},
+            "$push": {"recent": {"$each": [summary], "$slice": -USER_STATS_RECENT}},
+        },
+        upsert=True
+    )
+
+
+async def get_user_stats(user_id) -> dict:
+    doc = await user_stats_collection.find_one({"_id": user_id}) or {}
+    rubric = doc.get("rubric", {})
+    averages = {}
+    for category in RUBRIC_CATEGORIES:
+        entry = rubric.get(rubric_key(category), {})
+        count = entry.get("count", 0)
+        averages[category] = {
+            "average": round(entry["sum"] / count, 2) if count else None,
+            "count": count,
+        }
+    recent = doc.get("recent", [])
+    return {
+        "sessions_evaluated": doc.get("sessions_evaluated", 0),
+        "rubric_averages": averages,
+        "recent": list(reversed(recent)),  # newest first
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+async def rebuild(user_id) -> dict:
+    """Recompute a user's stats from their sessions' first evaluations."""
+    summaries, sums, counts = [], {}, {}
+    cursor = live_sessions_collection.find(
+        {"user_id": user_id, "evaluation_history.0": {"$exists": True}},
+        {"case_id": 1, "case_title": 1, "case_type": 1, "evaluation_history": {"$slice": 1}}
+    ).sort("_id", 1)
+    async for session in cursor:
+        first = session["evaluation_history"][0]
+        summary = session_summary(session, first.get("evaluation") or {}, first.get("timestamp"))
+        summaries.append(summary)
+        for key, score in summary["scores"].items():
+            sums[key] = sums.get(key, 0.0) + score
+            counts[key] = counts.get(key, 0) + 1
+
+    summaries.sort(key=lambda s: s["evaluated_at"] or datetime.min)
+    await user_stats_collection.replace_one({"_id": user_id}, {
+        "sessions_evaluated": len(summaries),
+        "rubric": {key: {"sum": sums[key], "count": counts[key]} for key in sums},
+        "recent": summaries[-USER_STATS_RECENT:],
+        "updated_at": datetime.utcnow(),
+    }, upsert=True)
+    return {"user_id": str(user_id), "sessions_evaluated": len(summaries)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_stats from live_sessions")
+    parser.add_argument("--user", help="user id (default: every user)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run():
+        if args.user:
+            return [await rebuild(ObjectId(args.user))]
+        return [await rebuild(user["_id"]) async for user in users_collection.find({}, {"_id": 1})]
+
+    for result in asyncio.run(_run()):
+        print(f"  {result['user_id']}  sessions_evaluated={result['sessions_evaluated']}")
+
+
+if __name__ == "__main__":
+    main()
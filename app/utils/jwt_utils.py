@@ -1,12 +1,44 @@
 from datetime import datetime, timedelta
 import os
-from jose import jwt
+import uuid
+from dotenv import load_dotenv
+from jose import jwt, JWTError
 
-SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
+load_dotenv()
+
+# No default: a known key would let anyone mint tokens for any user
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("SECRET_KEY is not set; add it to the environment or .env")
 ALGORITHM = "HS256"
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_token_pair(user_id: str, username: str) -> dict:
+    """Short-lived access token plus a refresh token; each has its own jti for revocation."""
+    claims = {"sub": user_id, "username": username}
+    return {
+        "access_token": create_access_token(
+            {**claims, "typ": "access", "jti": uuid.uuid4().hex},
+            timedelta(minutes=ACCESS_TOKEN_MINUTES)
+        ),
+        "refresh_token": create_access_token(
+            {**claims, "typ": "refresh", "jti": uuid.uuid4().hex},
+            timedelta(days=REFRESH_TOKEN_DAYS)
+        ),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTES * 60,
+    }
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verify signature and expiry; raises JWTError (incl. ExpiredSignatureError)."""
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if claims.get("typ") != token_type or not claims.get("sub") or not claims.get("jti"):
+        raise JWTError(f"Not a valid {token_type} token")
+    return claims
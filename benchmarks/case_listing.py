@@ -0,0 +1,87 @@
+"""
+Payload size and response time of the case / moot-problem listings, before and after
+File: benchmarks/case_listing.py
+Run: python -m benchmarks.case_listing [--repeat 20]
+
+Runs against the configured MongoDB. "before" is the old handler: every
+document with its full body. "after" is the default projected listing
+(every case, first 100 moot problems), and "304" is a revalidation with
+a matching ETag: the same query and body hash, but nothing sent back.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.api.cases import body_etag, list_page, list_projection
+from app.database.mongodb import cases_collection, moot_problems_collection
+
+
+async def _old_cases():
+    docs = []
+    async for doc in cases_collection.find():
+        doc["_id"] = str(doc["_id"])
+        docs.append(doc)
+    return docs
+
+
+async def _old_problems():
+    return {"moot_problems": await moot_problems_collection.find({}, {"_id": 0}).to_list(length=100)}
+
+
+async def _new_cases():
+    docs, _ = await list_page(cases_collection, list_projection(None, {}), None, None)
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    return docs
+
+
+async def _new_problems():
+    docs, next_cursor = await list_page(moot_problems_collection, list_projection(None, {"_id": 0}), None, 100)
+    return {"moot_problems": docs, "next_cursor": next_cursor}
+
+
+async def _measure(fn, repeat: int) -> dict:
+    times, size = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = await fn()
+        size = len(json.dumps(body, default=str).encode()) if body is not None else 0
+        times.append(time.perf_counter() - t0)
+    return {"bytes": size, "p50_ms": statistics.median(times) * 1000, "max_ms": max(times) * 1000}
+
+
+async def _run(repeat: int) -> list:
+    async def _revalidate(new):
+        body_etag(await new())
+        return None
+
+    rows = []
+    for name, old, new in (
+        ("/cases", _old_cases, _new_cases),
+        ("/moot-problems", _old_problems, _new_problems),
+    ):
+        rows.append((name, "before", await _measure(old, repeat)))
+        rows.append((name, "after", await _measure(new, repeat)))
+        rows.append((name, "304", await _measure(lambda: _revalidate(new), repeat)))
+    return rows
+
+
+def run_benchmark(repeat: int):
+    rows = asyncio.run(_run(repeat))
+
+    print("\n" + "=" * 64)
+    print(f"     LISTING PAYLOADS — median of {repeat} runs")
+    print("=" * 64)
+    for name, variant, r in rows:
+        print(f"  {name:<15} {variant:<7} {r['bytes']:>10,} bytes  p50={r['p50_ms']:7.2f} ms  "
+              f"max={r['max_ms']:7.2f} ms")
+    print("=" * 64 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare listing payloads before and after projection/pagination")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.repeat)
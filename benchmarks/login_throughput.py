@@ -0,0 +1,88 @@
+"""
+Login throughput and event-loop stalls under a burst of concurrent logins
+File: benchmarks/login_throughput.py
+Run: python -m benchmarks.login_throughput [--logins 64] [--concurrency 32]
+
+Each simulated login is a 2 ms database read plus a bcrypt verify. The
+same burst runs twice: bcrypt inline on the event loop (the old handler)
+and through the password pool. A heartbeat task ticking every 10 ms
+stands in for a live SSE stream — its worst delay is the stall every
+other request on the worker would see.
+"""
+import argparse
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from app.services.password_pool import PasswordPool
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+HEARTBEAT_S = 0.01
+
+
+async def _heartbeat(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_S)
+        worst = max(worst, time.perf_counter() - t0 - HEARTBEAT_S)
+    return worst
+
+
+async def _burst(mode: str, hashed: str, logins: int, concurrency: int, pool: PasswordPool) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with sem:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.002)  # users_collection.find_one
+            if mode == "inline":
+                ok = pwd_context.verify("correct horse", hashed)
+            else:
+                ok = await pool.run("verify", pwd_context.verify, "correct horse", hashed)
+            assert ok
+            latencies.append(time.perf_counter() - t0)
+
+    stop = asyncio.Event()
+    heartbeat = asyncio.ensure_future(_heartbeat(stop))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "logins_per_s": logins / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max_stall": await heartbeat,
+    }
+
+
+def run_benchmark(logins: int, concurrency: int, workers: int):
+    hashed = pwd_context.hash("correct horse")
+    pool = PasswordPool(workers=workers, max_queue=logins)
+    results = [
+        asyncio.run(_burst("inline", hashed, logins, concurrency, pool)),
+        asyncio.run(_burst("pool", hashed, logins, concurrency, pool)),
+    ]
+
+    print("\n" + "=" * 64)
+    print(f"     LOGIN BURST — {logins} logins, {concurrency} concurrent, {workers} bcrypt workers")
+    print("=" * 64)
+    for r in results:
+        print(f"  {r['mode']:<7} {r['logins_per_s']:6.1f} logins/s  p50={r['p50'] * 1000:6.0f} ms  "
+              f"p95={r['p95'] * 1000:6.0f} ms  worst loop stall={r['max_stall'] * 1000:6.0f} ms")
+    print(f"\n  Pool: {pool.snapshot()}")
+    print("=" * 64 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login throughput with and without the password pool")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    run_benchmark(args.logins, args.concurrency, args.workers)
@@ -0,0 +1,108 @@
+"""
+Respondent turn latency: sequential pipeline vs StageGraph
+File: benchmarks/respondent_turn.py
+Run: python -m benchmarks.respondent_turn
+
+Stage latencies are simulated (asyncio.sleep) with typical production
+timings, so the comparison isolates the scheduling change from Groq,
+edge-tts and Mongo variance.
+"""
+import asyncio
+import time
+
+from app.services.stage_graph import StageGraph
+
+# Seconds per stage — roughly what we see per hearing step
+STAGE_LATENCY = {
+    "respondent_rag": 6.0,
+    "respondent_tts": 3.5,
+    "judge_lookup":   0.02,
+    "judge_tts":      0.8,
+    "session_read":   0.05,
+    "judge_reply":    2.2,
+    "reply_tts":      1.2,
+    "mongo_push":     0.02,
+}
+SCALE = 0.1  # run 10x faster than real time
+
+
+async def _stage(name: str, result=None):
+    await asyncio.sleep(STAGE_LATENCY[name] * SCALE)
+    return result if result is not None else name
+
+
+async def sequential_turn() -> dict:
+    """Mirrors the old event_generator: every stage waits for the previous one."""
+    marks = {}
+    t0 = time.perf_counter()
+    await _stage("respondent_rag")
+    await _stage("respondent_tts")
+    await _stage("mongo_push")
+    marks["respondent_argument"] = time.perf_counter() - t0
+    await _stage("judge_lookup")
+    await _stage("judge_tts")
+    await _stage("mongo_push")
+    marks["judge_question"] = time.perf_counter() - t0
+    await _stage("session_read")
+    await _stage("judge_reply")
+    await _stage("reply_tts")
+    await _stage("mongo_push")
+    marks["respondent_reply"] = time.perf_counter() - t0
+    return marks
+
+
+async def graph_turn() -> dict:
+    """Same stages, scheduled by dependency like build_respondent_graph."""
+    graph = (
+        StageGraph("bench")
+        .add("respondent_argument", lambda: _stage("respondent_rag"))
+        .add("respondent_audio", lambda respondent_argument: _stage("respondent_tts"),
+             deps=["respondent_argument"])
+        .add("judge_question", lambda: _stage("judge_lookup"))
+        .add("judge_audio", lambda judge_question: _stage("judge_tts"), deps=["judge_question"])
+        .add("respondent_reply", lambda judge_question: _stage("judge_reply"), deps=["judge_question"])
+        .add("respondent_reply_audio", lambda respondent_reply: _stage("reply_tts"),
+             deps=["respondent_reply"])
+        .start()
+    )
+    marks = {}
+    t0 = time.perf_counter()
+    await graph.result("respondent_argument")
+    await graph.result("respondent_audio")
+    await _stage("mongo_push")
+    marks["respondent_argument"] = time.perf_counter() - t0
+    await graph.result("judge_question")
+    await graph.result("judge_audio")
+    await _stage("mongo_push")
+    marks["judge_question"] = time.perf_counter() - t0
+    await graph.result("respondent_reply")
+    await graph.result("respondent_reply_audio")
+    await _stage("mongo_push")
+    marks["respondent_reply"] = time.perf_counter() - t0
+    return marks
+
+
+def _report(label: str, marks: dict):
+    print(f"\n  {label}")
+    for event, t in marks.items():
+        print(f"    {event:<22} emitted at {t / SCALE:6.2f}s")
+
+
+def run_benchmark():
+    print("\n" + "=" * 60)
+    print("     RESPONDENT TURN LATENCY (simulated, real-time seconds)")
+    print("=" * 60)
+    before = asyncio.run(sequential_turn())
+    after = asyncio.run(graph_turn())
+    _report("Sequential (before)", before)
+    _report("StageGraph (after)", after)
+    total_before = before["respondent_reply"] / SCALE
+    total_after = after["respondent_reply"] / SCALE
+    print("\n" + "=" * 60)
+    print(f"  End-to-end turn: {total_before:.2f}s -> {total_after:.2f}s "
+          f"({(1 - total_after / total_before):.0%} faster)")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,139 @@
+"""
+Speed vs accuracy of STT backends over a local WAV fixture set
+File: benchmarks/stt_backends.py
+Run: python -m benchmarks.stt_backends [--fixtures DIR] [--configs CFG ...]
+
+Each fixture is <name>.wav with the reference transcript in <name>.txt.
+Fixtures are not committed (recordings of real hearings stay out of the
+repo). Put them in benchmarks/fixtures/stt or pass --fixtures, e.g.
+petitioner clips exported from a dev database with hand-checked
+transcripts, or utterances from LibriSpeech test-clean (.flac converted
+to .wav) with their reference lines.
+A config is backend:model[:compute_type][:beam][:language], e.g.
+    whisper:base            (the current default)
+    faster-whisper:base:int8:1:en
+Reports real-time factor (decode seconds / audio seconds, lower is
+faster) and word error rate against the references.
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import librosa
+import soundfile as sf
+
+from rag.moot_rag.audio.stt import make_engine
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "stt")
+DEFAULT_CONFIGS = [
+    "whisper:base",
+    "whisper:base::1:en",
+    "faster-whisper:base:int8:1:en",
+    "faster-whisper:small:int8:1:en",
+]
+
+
+def parse_config(spec: str):
+    parts = spec.split(":") + [""] * 5
+    backend, model, compute_type, beam, language = parts[:5]
+    return backend, {
+        "model_size": model or "base",
+        "compute_type": compute_type or "int8",
+        "beam_size": int(beam) if beam else 1,
+        "language": language or None,
+    }
+
+
+def load_fixtures(directory: str):
+    fixtures = []
+    if not os.path.isdir(directory):
+        return fixtures
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".wav"):
+            continue
+        ref_path = os.path.join(directory, name[:-4] + ".txt")
+        if not os.path.exists(ref_path):
+            continue
+        audio, sr = sf.read(os.path.join(directory, name))
+        if audio.ndim == 2:
+            audio = np.mean(audio, axis=1)
+        if sr != 16000:
+            audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
+        with open(ref_path, encoding="utf-8") as f:
+            reference = f.read()
+        fixtures.append((name, audio.astype(np.float32), reference))
+    return fixtures
+
+
+def _words(text: str) -> list:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str):
+    """(edit distance in words, reference word count)."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def run_config(spec: str, fixtures) -> dict:
+    backend, kwargs = parse_config(spec)
+    engine = make_engine(backend, **kwargs)
+    t0 = time.perf_counter()
+    engine.load()
+    load_s = time.perf_counter() - t0
+
+    audio_s = decode_s = 0.0
+    errors = ref_words = 0
+    for _name, audio, reference in fixtures:
+        t0 = time.perf_counter()
+        hypothesis = engine.transcribe(audio)
+        decode_s += time.perf_counter() - t0
+        audio_s += len(audio) / 16000
+        e, n = word_errors(reference, hypothesis)
+        errors += e
+        ref_words += n
+    return {
+        "config": spec,
+        "load_s": load_s,
+        "rtf": decode_s / audio_s if audio_s else None,
+        "wer": errors / ref_words if ref_words else None,
+    }
+
+
+def run_benchmark(fixtures_dir: str, configs: list):
+    fixtures = load_fixtures(fixtures_dir)
+    if not fixtures:
+        print(f"No <name>.wav + <name>.txt fixtures found in {fixtures_dir}")
+        return
+    total_audio = sum(len(a) for _, a, _ in fixtures) / 16000
+
+    results = []
+    for spec in configs:
+        try:
+            results.append(run_config(spec, fixtures))
+        except Exception as e:
+            print(f"  {spec}: skipped ({e})")
+
+    print("\n" + "=" * 64)
+    print(f"     STT BACKENDS — {len(fixtures)} clips, {total_audio:.1f}s of audio")
+    print("=" * 64)
+    for r in results:
+        print(f"  {r['config']:<34} load={r['load_s']:5.1f}s  "
+              f"RTF={r['rtf']:.3f}  WER={r['wer']:.1%}")
+    print("=" * 64 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark STT backends for speed (RTF) and accuracy (WER)")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    args = parser.parse_args()
+    run_benchmark(args.fixtures, args.configs)
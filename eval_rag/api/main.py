@@ -13,6 +13,7 @@ from groq import Groq
 
 app = FastAPI()
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+EVAL_LLM_TIMEOUT_S = float(os.getenv("EVAL_LLM_TIMEOUT_S", "60"))
 
 # ======================
 # SCHEMA
@@ -34,20 +35,30 @@ class EvalRequest(BaseModel):
 # LLM CALL
 # ======================
 
-def call_llm(prompt: str):
+EVAL_MODEL = "llama-3.1-8b-instant"
+
+
+def _eval_messages(prompt: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "You are a strict moot court evaluator. Evaluate ONLY the petitioner."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def call_llm(prompt: str, timeout: float = EVAL_LLM_TIMEOUT_S):
+    # JSON mode — the API guarantees a single valid JSON object
     response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a strict moot court evaluator. Evaluate ONLY the petitioner."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0
+        model=EVAL_MODEL,
+        messages=_eval_messages(prompt),
+        temperature=0,
+        response_format={"type": "json_object"},
+        timeout=timeout
     )
 
     message = response.choices[0].message.content
@@ -60,6 +71,25 @@ def call_llm(prompt: str):
             "raw_output": message
         }
 
+
+def stream_llm(prompt: str, timeout: float = EVAL_LLM_TIMEOUT_S):
+    """
+    Yield the evaluator's text deltas as they arrive.
+    Groq does not allow JSON mode together with streaming, so the prompt's
+    JSON contract is enforced by ScoreStreamParser on our side instead.
+    """
+    stream = client.chat.completions.create(
+        model=EVAL_MODEL,
+        messages=_eval_messages(prompt),
+        temperature=0,
+        stream=True,
+        timeout=timeout
+    )
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
 # # ======================
 # # API ENDPOINT
 # # ======================
@@ -1,3 +1,5 @@
+import hashlib
+
 RUBRIC_TEXT = """
 You must evaluate ONLY the PETITIONER (the human user).
 
@@ -38,3 +40,19 @@ Rules:
 - Do NOT evaluate the opponent
 - Do NOT repeat arguments across categories
 """
+
+# Category keys the evaluator must return under "scores", in prompt order
+RUBRIC_CATEGORIES = [
+    "Legal Arguments",
+    "Application of Law",
+    "Organization & Clarity",
+    "Delivery & Courtroom Tone",
+    "Responsiveness to Judge",
+    "Responsiveness to Opponent",
+]
+
+# Bumps automatically whenever the rubric wording changes — part of the
+# evaluation cache key, so stale results are never served for a new rubric
+RUBRIC_VERSION = hashlib.sha256(
+    (RUBRIC_TEXT + "|".join(RUBRIC_CATEGORIES)).encode("utf-8")
+).hexdigest()[:12]
@@ -0,0 +1,89 @@
+"""
+eval_rag/evaluator/stream_parser.py
+Incremental parser for the evaluator's rubric JSON.
+
+Emits each category under "scores" as soon as its object closes, so the
+client can render scores while the LLM is still writing the rest.
+Anything before the first '{' (stray preamble) is ignored.
+"""
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreStreamParser:
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = ""
+        self._keys: Dict[int, str] = {}
+        self._scores_depth: Optional[int] = None
+        self._category: Optional[str] = None
+        self._category_start = 0
+        self.completed: Dict[str, dict] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        """Consume the next text delta; return categories that just completed."""
+        self.buffer += chunk
+        done = []
+        while self._pos < len(self.buffer):
+            i = self._pos
+            c = self.buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = self.buffer[self._string_start:i]
+                continue
+
+            if self._depth == 0 and c != "{":
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif c == ":":
+                self._keys[self._depth] = self._last_string
+            elif c == "{":
+                key = self._keys.get(self._depth)
+                if self._depth == 1 and key == "scores":
+                    self._scores_depth = 2
+                elif self._scores_depth and self._depth == self._scores_depth:
+                    self._category = key
+                    self._category_start = i
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._category and self._depth == self._scores_depth:
+                    raw = self.buffer[self._category_start:i + 1]
+                    try:
+                        obj = json.loads(raw)
+                        self.completed[self._category] = obj
+                        done.append((self._category, obj))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Unparseable score block for {self._category!r}")
+                    self._category = None
+                elif self._scores_depth and self._depth == self._scores_depth - 1:
+                    self._scores_depth = None
+        return done
+
+    def result(self) -> dict:
+        """Full evaluation object; falls back to the categories seen so far."""
+        start = self.buffer.find("{")
+        if start != -1:
+            try:
+                return json.loads(self.buffer[start:self.buffer.rfind("}") + 1])
+            except json.JSONDecodeError:
+                logger.warning("Evaluator stream did not end in valid JSON")
+        return {"scores": dict(self.completed)}
@@ -1,26 +1,84 @@
-from fastapi import FastAPI
+import hmac
+import os
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+# Before the app imports: modules read their settings (SECRET_KEY, limits, timeouts) at import time
+load_dotenv()
+
 from app.routes import auth
 from app.api import cases
 from app.api import moot 
-load_dotenv()
+from app.database.indexes import ensure_indexes, explain_hot_queries
+from app.services.deadlines import stage_metrics
+from app.services.audio_render import render_stats
+from app.services.stt_pool import stt_pool
+from app.services.revocation import revocation_list
+from app.services.password_pool import password_pool
+from app.services.reference_cache import start_watchers, stop_watchers, reference_cache_stats
+from app.services.eval_jobs import evaluation_jobs
+from rag.moot_rag.audio.vad import vad_stats
+from rag.moot_rag.audio.tts_cache import tts_cache
+from rag.moot_rag.audio.tts import get_engine, tts_stats
 
 app = FastAPI()
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
+    allow_origins=moot.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # pagination cursor and validators are response headers the frontend reads
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth.router)
 app.include_router(cases.router)
 
 app.include_router(moot.router)
+@app.on_event("startup")
+async def startup():
+    await ensure_indexes()
+    start_watchers()
+    evaluation_jobs.start(moot.evaluation_job)
+    await evaluation_jobs.recover()
+    if os.getenv("MONGO_EXPLAIN_ON_STARTUP") == "1":
+        await explain_hot_queries()
+
+@app.on_event("shutdown")
+async def shutdown():
+    stop_watchers()
+    await evaluation_jobs.stop()
+    await get_engine().close()
+    stt_pool.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+# /metrics is internal: off unless METRICS_TOKEN is set, then only with X-Metrics-Token
+@app.get("/metrics")
+async def metrics(x_metrics_token: Optional[str] = Header(default=None)):
+    expected = os.getenv("METRICS_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_metrics_token or not hmac.compare_digest(x_metrics_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return {
+        "stages": stage_metrics.snapshot(),
+        "evaluations": moot.evaluation_flights.snapshot(),
+        "evaluation_jobs": evaluation_jobs.snapshot(),
+        "tts": tts_stats(),
+        "tts_cache": tts_cache.snapshot(),
+        "audio_renders": render_stats(),
+        "stt": stt_pool.snapshot(),
+        "vad": vad_stats.snapshot(stt_pool.rtf()),
+        "auth": {**auth.auth_stats, "revocation": revocation_list.snapshot()},
+        "passwords": password_pool.snapshot(),
+        "reference_cache": reference_cache_stats(),
+    }
+
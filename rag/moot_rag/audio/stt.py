@@ -1,17 +1,121 @@
 import io
 import logging
-import whisper
+import os
+from typing import Optional
+
 import soundfile as sf
 import numpy as np
 import librosa
 
 logger = logging.getLogger(__name__)
-model = whisper.load_model("base")  # load once globally
 
+STT_BACKEND = os.getenv("STT_BACKEND", "whisper")
+STT_MODEL = os.getenv("STT_MODEL", "base")
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+STT_BEAM_SIZE = int(os.getenv("STT_BEAM_SIZE", "1"))
+# A fixed language (e.g. "en") skips per-clip language detection
+STT_LANGUAGE = os.getenv("STT_LANGUAGE") or None
+
+
+# ================= ENGINES =================
+class STTEngine:
+    """
+    Pluggable transcription backend. Models load on first use, so importing
+    this module stays cheap; pool workers call load() once at startup.
+    """
+    name = "base"
+
+    def __init__(self, model_size: str = STT_MODEL, beam_size: int = STT_BEAM_SIZE,
+                 language: Optional[str] = STT_LANGUAGE):
+        self.model_size = model_size
+        self.beam_size = beam_size
+        self.language = language
+        self._model = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model_size}:beam{self.beam_size}:{self.language or 'auto'}"
+
+    def _load(self):
+        raise NotImplementedError
+
+    def load(self):
+        if self._model is None:
+            logger.info(f"STT: loading {self.label} (pid {os.getpid()})")
+            self._model = self._load()
+        return self._model
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        """16 kHz mono float32 samples -> text."""
+        raise NotImplementedError
+
+
+class WhisperEngine(STTEngine):
+    """openai-whisper, fp32 PyTorch on CPU."""
+    name = "whisper"
+
+    def _load(self):
+        import whisper
+        return whisper.load_model(self.model_size)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        # beam_size=None is whisper's greedy decode
+        beam_size = self.beam_size if self.beam_size > 1 else None
+        result = self.load().transcribe(audio, language=self.language, fp16=False, beam_size=beam_size)
+        return (result.get("text") or "").strip()
+
+
+class FasterWhisperEngine(STTEngine):
+    """CTranslate2 Whisper (faster-whisper) with quantized weights, int8 by default."""
+    name = "faster-whisper"
+
+    def __init__(self, compute_type: str = STT_COMPUTE_TYPE, **kwargs):
+        super().__init__(**kwargs)
+        self.compute_type = compute_type
+
+    @property
+    def label(self) -> str:
+        return f"{super().label}:{self.compute_type}"
+
+    def _load(self):
+        from faster_whisper import WhisperModel
+        return WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type)
 
+    def transcribe(self, audio: np.ndarray) -> str:
+        segments, _info = self.load().transcribe(audio, beam_size=self.beam_size, language=self.language)
+        return "".join(segment.text for segment in segments).strip()
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+
+def make_engine(backend: str, **kwargs) -> STTEngine:
+    if backend not in ENGINES:
+        raise ValueError(f"Unknown STT backend '{backend}' (choose from {', '.join(ENGINES)})")
+    if backend != FasterWhisperEngine.name:
+        kwargs.pop("compute_type", None)
+    return ENGINES[backend](**kwargs)
+
+
+_engine: STTEngine = make_engine(STT_BACKEND)
+
+
+def get_engine() -> STTEngine:
+    return _engine
+
+
+def set_engine(engine: STTEngine):
+    global _engine
+    _engine = engine
+
+
+# ================= API =================
 def speech_to_text(wav_stream: io.BytesIO) -> str:
     """
-    Transcribe WAV audio to text using Whisper.
+    Transcribe WAV audio to text using the configured engine.
     Expects mono or stereo 16-bit WAV; resamples to 16 kHz if needed.
     """
     wav_stream.seek(0)
@@ -32,14 +136,23 @@ def speech_to_text(wav_stream: io.BytesIO) -> str:
     if sr != 16000:
         audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
 
+    return transcribe_array(audio)
+
+
+def pcm_to_text(pcm: bytes) -> str:
+    """Transcribe 16 kHz mono s16le PCM (what process_audio produces)."""
+    if not pcm:
+        return ""
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    return transcribe_array(audio)
+
+
+def transcribe_array(audio: np.ndarray) -> str:
     if audio.dtype != np.float32:
         audio = audio.astype(np.float32)
 
     try:
-        result = model.transcribe(audio, language=None, fp16=False)
+        return get_engine().transcribe(audio)
     except Exception as e:
-        logger.exception("STT: Whisper transcribe failed")
+        logger.exception("STT: transcribe failed")
         raise RuntimeError(f"Transcription failed: {e}") from e
-
-    text = (result.get("text") or "").strip()
-    return text
@@ -1,11 +1,21 @@
 # app/rag/moot_rag/audio/tts.py
 import asyncio
-import logging
 import io
+import logging
+import os
+import struct
+import wave
+import weakref
+from typing import Optional
+
 import edge_tts
 
+from rag.moot_rag.audio.tts_cache import tts_cache, cache_key
+
 logger = logging.getLogger(__name__)
 
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "6"))
+
 # Distinct voices per courtroom role — makes VR experience more immersive
 VOICES = {
     "default":    "en-US-GuyNeural",
@@ -14,41 +24,202 @@ VOICES = {
     "petitioner": "en-US-EricNeural",          # neutral
 }
 
-async def _tts_async(text: str, voice: str = "default") -> bytes:
-    """Core async TTS — streams audio chunks and returns raw bytes."""
-    voice_name = VOICES.get(voice, VOICES["default"])
-    communicate = edge_tts.Communicate(text.strip(), voice_name)
 
-    buf = io.BytesIO()
-    async for chunk in communicate.stream():
-        if chunk["type"] == "audio":
-            buf.write(chunk["data"])
+# ================= ENGINES =================
+class TTSEngine:
+    """
+    Pluggable synthesis backend. `version` is part of every cache key, so
+    switching engines never serves another engine's clips.
+    """
+    name = "base"
+    version = "0"
+    mime = "audio/mpeg"
 
-    audio_bytes = buf.getvalue()
-    if not audio_bytes:
-        raise RuntimeError(f"edge-tts produced empty audio for voice={voice_name}")
-    return audio_bytes
+    def voice_name(self, voice: str) -> str:
+        return voice
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class EdgeTTSEngine(TTSEngine):
+    """
+    Microsoft Edge online voices. edge-tts opens one websocket per utterance
+    and closes any connector handed to it when that socket ends, so there
+    is no connection to share — concurrency is bounded by the semaphore.
+    """
+    name = "edge-tts"
+    version = f"edge-tts/{getattr(edge_tts, '__version__', 'unknown')}"
+
+    def voice_name(self, voice: str) -> str:
+        return VOICES.get(voice, VOICES["default"])
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        voice_name = self.voice_name(voice)
+        communicate = edge_tts.Communicate(text.strip(), voice_name)
+
+        buf = io.BytesIO()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                buf.write(chunk["data"])
+
+        audio_bytes = buf.getvalue()
+        if not audio_bytes:
+            raise RuntimeError(f"edge-tts produced empty audio for voice={voice_name}")
+        return audio_bytes
+
+
+class HTTPTTSEngine(TTSEngine):
+    """
+    Local / offline TTS server (Piper, Coqui, ...) behind a simple HTTP API:
+    POST {url} {"text": ..., "voice": ...} -> audio bytes.
+    One aiohttp session is kept open so requests reuse pooled connections.
+    """
+    name = "http"
+
+    def __init__(self, url: str, mime: str = "audio/wav"):
+        self.url = url
+        self.mime = mime
+        self.version = f"http/{url}"
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=TTS_MAX_CONCURRENCY, keepalive_timeout=60)
+            )
+        return self._session
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        session = await self._get_session()
+        async with session.post(self.url, json={"text": text.strip(), "voice": voice}) as resp:
+            resp.raise_for_status()
+            audio_bytes = await resp.read()
+        if not audio_bytes:
+            raise RuntimeError(f"TTS server produced empty audio for voice={voice}")
+        return audio_bytes
 
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
 
-def text_to_speech(text: str, voice: str = "default") -> bytes:
+
+class StubTTSEngine(TTSEngine):
+    """Offline stand-in for tests and dev: silent WAV, ~60 ms per word."""
+    name = "stub"
+    version = "stub/1"
+    mime = "audio/wav"
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        frames = 16000 * 60 // 1000 * max(1, len(text.split()))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(struct.pack("<h", 0) * frames)
+        return buf.getvalue()
+
+
+def _engine_from_env() -> TTSEngine:
+    kind = os.getenv("TTS_ENGINE", "edge").lower()
+    if kind == "http":
+        return HTTPTTSEngine(os.getenv("TTS_HTTP_URL", "http://localhost:5002/tts"),
+                             mime=os.getenv("TTS_HTTP_MIME", "audio/wav"))
+    if kind == "stub":
+        return StubTTSEngine()
+    return EdgeTTSEngine()
+
+
+_engine: TTSEngine = _engine_from_env()
+
+
+def get_engine() -> TTSEngine:
+    return _engine
+
+
+def set_engine(engine: TTSEngine):
+    """Swap the synthesis backend (e.g. StubTTSEngine in tests)."""
+    global _engine
+    _engine = engine
+
+
+# ================= ASYNC API =================
+_limits: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_in_flight = 0
+
+
+def _limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _limits.get(loop)
+    if sem is None:
+        sem = _limits[loop] = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+    return sem
+
+
+async def synthesize(text: str, voice: str = "default", timeout: Optional[float] = None,
+                     use_cache: bool = True) -> bytes:
     """
-    Sync wrapper — returns raw audio bytes directly (no disk I/O).
-    Safe to call via asyncio.to_thread() from FastAPI routes.
+    Synthesize on the caller's event loop — no per-call loop; only cache
+    file I/O goes to a worker thread.
+    Served from the on-disk AudioCache when the same (voice, text) was
+    synthesized before; at most TTS_MAX_CONCURRENCY syntheses run at once.
 
     Args:
         text:  Text to synthesize.
         voice: One of 'default', 'judge', 'respondent', 'petitioner'.
+        timeout: Seconds before synthesis is abandoned (None = no limit).
+        use_cache: Set False to force a fresh synthesis.
 
     Returns:
-        Raw MP3 audio bytes.
+        Raw audio bytes (MP3 for edge-tts; see get_engine().mime).
 
     Raises:
         ValueError:   If text is empty.
         RuntimeError: If TTS produces no output.
+        TimeoutError: If synthesis does not finish within `timeout`.
     """
+    global _in_flight
     if not text or not text.strip():
         raise ValueError("TTS requires non-empty text")
-    return asyncio.run(_tts_async(text, voice))
+
+    engine = _engine
+    key = cache_key(engine.voice_name(voice), text, engine.version, engine.mime)
+    if use_cache:
+        cached = await tts_cache.aget(key, engine.mime)
+        if cached:
+            return cached
+
+    async with _limit():
+        _in_flight += 1
+        try:
+            audio_bytes = await asyncio.wait_for(engine.synthesize(text, voice), timeout)
+        finally:
+            _in_flight -= 1
+    await tts_cache.aput(key, audio_bytes, engine.mime)
+    return audio_bytes
+
+
+def tts_stats() -> dict:
+    return {
+        "engine": _engine.name,
+        "in_flight": _in_flight,
+        "max_concurrency": TTS_MAX_CONCURRENCY,
+    }
+
+
+# ================= SYNC WRAPPERS =================
+def text_to_speech(text: str, voice: str = "default", timeout: Optional[float] = None,
+                   use_cache: bool = True) -> bytes:
+    """
+    Blocking wrapper around synthesize() for scripts and threads that have
+    no event loop. Routes should await synthesize() directly.
+    """
+    return asyncio.run(synthesize(text, voice, timeout, use_cache))
 
 
 def tts_to_bytes(tts_output) -> bytes:
@@ -61,4 +232,4 @@ def tts_to_bytes(tts_output) -> bytes:
     if isinstance(tts_output, str):
         with open(tts_output, "rb") as f:
             return f.read()
-    raise RuntimeError(f"Unexpected TTS output type: {type(tts_output).__name__}")
\ No newline at end of file
+    raise RuntimeError(f"Unexpected TTS output type: {type(tts_output).__name__}")
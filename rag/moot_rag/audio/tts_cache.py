@@ -0,0 +1,177 @@
+# rag/moot_rag/audio/tts_cache.py
+"""
+Content-addressed, size-bounded LRU cache for synthesized audio.
+
+Clips are stored on disk as <sha256>.<ext>, keyed by (engine version,
+audio format, voice, normalized text); the extension follows the engine's
+mime type. Recency survives restarts through file mtimes, so the index is
+rebuilt by a directory scan at startup. A lookup that misses the index
+checks the disk, so clips written later by another process are served.
+
+get/put do blocking file I/O (and put may evict); async callers use
+aget/aput, which run them in a worker thread.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../tts_cache")
+)
+CACHE_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/ogg": ".ogg",
+    "audio/webm": ".webm",
+    "audio/flac": ".flac",
+}
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def extension(mime: str) -> str:
+    return EXTENSIONS.get(mime, ".bin")
+
+
+def cache_key(voice_name: str, text: str, engine_version: str, mime: str = "audio/mpeg") -> str:
+    raw = f"{engine_version}|{mime}|{voice_name}|{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    # Index entries are file names (<key><ext>), so one key can't collide across formats
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_index(self):
+        entries = []
+        known = set(EXTENSIONS.values()) | {".bin"}
+        for name in os.listdir(self.directory):
+            if os.path.splitext(name)[1] not in known:
+                continue
+            st = os.stat(self._path(name))
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._bytes += size
+        logger.info(f"[AudioCache] {len(self._index)} clips, {self._bytes / 1e6:.1f} MB in {self.directory}")
+
+    def get(self, key: str, mime: str = "audio/mpeg") -> Optional[bytes]:
+        name = key + extension(mime)
+        with self._lock:
+            indexed = name in self._index
+            if indexed:
+                self._index.move_to_end(name)
+        if not indexed and not self._adopt(name):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            os.utime(self._path(name))
+        except OSError:
+            with self._lock:
+                self._bytes -= self._index.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_served += len(data)
+        return data
+
+    def _adopt(self, name: str) -> bool:
+        """Index a clip written after startup (tts_warmup, another worker process)."""
+        try:
+            size = os.stat(self._path(name)).st_size
+        except OSError:
+            return False
+        with self._lock:
+            if name not in self._index:
+                self._bytes += size
+                self._index[name] = size
+            else:
+                self._index.move_to_end(name)
+            evicted = [old for old in self._evict() if old != name]
+        for old_name in evicted:
+            try:
+                os.remove(self._path(old_name))
+            except OSError:
+                pass
+        return True
+
+    def put(self, key: str, data: bytes, mime: str = "audio/mpeg"):
+        if not data or len(data) > self.max_bytes:
+            return
+        name = key + extension(mime)
+        tmp = f"{self._path(name)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(name))
+        except OSError as e:
+            logger.warning(f"[AudioCache] write failed for {name}: {e}")
+            return
+        with self._lock:
+            self._bytes += len(data) - self._index.pop(name, 0)
+            self._index[name] = len(data)
+            evicted = self._evict()
+        for old_name in evicted:
+            try:
+                os.remove(self._path(old_name))
+            except OSError:
+                pass
+
+    def _evict(self) -> list:
+        evicted = []
+        while self._bytes > self.max_bytes and self._index:
+            old_name, size = self._index.popitem(last=False)
+            self._bytes -= size
+            evicted.append(old_name)
+        return evicted
+
+    async def aget(self, key: str, mime: str = "audio/mpeg") -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key, mime)
+
+    async def aput(self, key: str, data: bytes, mime: str = "audio/mpeg"):
+        await asyncio.to_thread(self.put, key, data, mime)
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "bytes_served": self.bytes_served,
+        }
+
+
+tts_cache = AudioCache()
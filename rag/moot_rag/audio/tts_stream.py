@@ -0,0 +1,101 @@
+# rag/moot_rag/audio/tts_stream.py
+"""
+Sentence-pipelined TTS.
+
+Text arriving from a streaming LLM is cut into sentences; each sentence is
+synthesized as soon as it is complete (bounded parallelism) and the audio
+is handed back strictly in sentence order, so playback can start after
+the first sentence instead of after the whole argument.
+"""
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+# Abbreviations common in legal argument that must not end a sentence
+_ABBREVIATIONS = {
+    "art", "arts", "s", "ss", "sec", "no", "nos", "v", "vs", "mr", "mrs", "ms",
+    "dr", "hon", "cl", "para", "paras", "ord", "r", "i.e", "e.g", "etc", "viz",
+    "p", "pp", "ch", "vol", "u/s", "pld", "scmr", "ltd", "co",
+}
+_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*(?=\s)|\n{2,}")
+
+
+class SentenceSegmenter:
+    """Feeds on text deltas and returns sentences once they are complete."""
+
+    def __init__(self, min_chars: int = 40):
+        self.min_chars = min_chars
+        self.text = ""
+        self._pending = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self.text += delta
+        self._pending += delta
+        out = []
+        start = 0
+        for m in _BOUNDARY.finditer(self._pending):
+            end = m.end()
+            candidate = self._pending[start:end].strip()
+            words = candidate.rstrip(".!?\"')]").rsplit(None, 1)
+            last_word = words[-1].lower() if words else ""
+            if last_word in _ABBREVIATIONS:
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            out.append(candidate)
+            start = end
+        self._pending = self._pending[start:]
+        return out
+
+    def flush(self) -> Optional[str]:
+        tail = self._pending.strip()
+        self._pending = ""
+        return tail or None
+
+    async def sentences(self, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+        async for delta in deltas:
+            for sentence in self.feed(delta):
+                yield sentence
+        tail = self.flush()
+        if tail:
+            yield tail
+
+
+async def pipelined_tts(
+    sentences: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable[Optional[bytes]]],
+    max_parallel: int = 3,
+) -> AsyncIterator[Tuple[int, str, Optional[bytes]]]:
+    """Yield (seq, sentence, audio) in order while later sentences synthesize."""
+    sem = asyncio.Semaphore(max_parallel)
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks = []
+
+    async def _synth(text: str):
+        async with sem:
+            return await synthesize(text)
+
+    async def _produce():
+        try:
+            async for sentence in sentences:
+                task = asyncio.ensure_future(_synth(sentence))
+                tasks.append(task)
+                await queue.put((sentence, task))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(_produce())
+    seq = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            sentence, task = item
+            yield seq, sentence, await task
+            seq += 1
+        await producer  # re-raise a failed text stream
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,172 @@
+# rag/moot_rag/audio/vad.py
+"""
+Energy-based voice activity detection on 16 kHz mono s16le PCM.
+
+Runs before Whisper: leading/trailing/inner silence is cut, long takes
+are split into speech segments at their quietest point, and clips with
+no speech at all are rejected without a decode. Only a clip whose every
+frame is below VAD_THRESHOLD_DBFS counts as having no speech; when the
+adaptive threshold finds nothing in a louder clip (e.g. speech with no
+pauses, where the noise floor estimate is the speech itself) the whole
+clip goes to Whisper.
+"""
+import os
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") not in ("0", "false", "False")
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DBFS = float(os.getenv("VAD_THRESHOLD_DBFS", "-45"))
+VAD_NOISE_MARGIN_DB = 12.0   # speech must also stand this far above the noise floor...
+VAD_THRESHOLD_CAP_DBFS = -35.0  # ...but anything this loud always counts
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+VAD_MERGE_GAP_MS = int(os.getenv("VAD_MERGE_GAP_MS", "600"))
+VAD_PADDING_MS = 200
+VAD_MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", "30"))
+
+
+class VADResult(NamedTuple):
+    segments: List[bytes]   # speech-only PCM, in order
+    total_s: float
+    speech_s: float
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.segments)
+
+    @property
+    def removed_s(self) -> float:
+        return round(self.total_s - self.speech_s, 2)
+
+
+def _frame_dbfs(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len) / 32768.0
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) frame ranges where mask is True."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def _split_long(start: int, end: int, db: np.ndarray, max_frames: int) -> List[Tuple[int, int]]:
+    """Cut runs longer than max_frames at the quietest frame in their second half."""
+    out = []
+    while end - start > max_frames:
+        lo, hi = start + max_frames // 2, start + max_frames
+        cut = lo + int(np.argmin(db[lo:hi]))
+        out.append((start, cut))
+        start = cut
+    out.append((start, end))
+    return out
+
+
+def _speech_frames(db: np.ndarray) -> np.ndarray:
+    noise_floor = np.percentile(db, 10)
+    threshold = max(VAD_THRESHOLD_DBFS, min(noise_floor + VAD_NOISE_MARGIN_DB, VAD_THRESHOLD_CAP_DBFS))
+    return db > threshold
+
+
+def detect_speech(pcm: bytes) -> VADResult:
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    total_s = len(samples) / SAMPLE_RATE
+    frame_len = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    if len(samples) < frame_len:
+        return VADResult([], round(total_s, 2), 0.0)
+
+    db = _frame_dbfs(samples, frame_len)
+    runs = _runs(_speech_frames(db))
+
+    # Bridge short pauses, then drop blips too short to be words
+    merge_gap = VAD_MERGE_GAP_MS // VAD_FRAME_MS
+    merged: List[Tuple[int, int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= merge_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    merged = [(s, e) for s, e in merged if e - s >= min_frames]
+    if not merged:
+        if not (db > VAD_THRESHOLD_DBFS).any():
+            return VADResult([], round(total_s, 2), 0.0)
+        merged = [(0, len(db))]  # audible but no contrast: let Whisper decide
+
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    max_frames = max(1, int(VAD_MAX_SEGMENT_S * 1000 / VAD_FRAME_MS))
+    segments, speech_samples = [], 0
+    for start, end in merged:
+        start, end = max(0, start - pad), min(len(db), end + pad)
+        for s, e in _split_long(start, end, db, max_frames):
+            chunk = samples[s * frame_len:e * frame_len]
+            speech_samples += len(chunk)
+            segments.append(chunk.tobytes())
+    return VADResult(segments, round(total_s, 2), round(speech_samples / SAMPLE_RATE, 2))
+
+
+def find_cut(pcm: bytes) -> Optional[int]:
+    """
+    Byte offset where a live recording can be cut without splitting a word:
+    the middle of the latest pause of at least VAD_MERGE_GAP_MS that follows
+    some speech, or the quietest point once the buffer exceeds
+    VAD_MAX_SEGMENT_S. None while neither has happened yet.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame_len = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    db = _frame_dbfs(samples, frame_len)
+    if len(db) == 0:
+        return None
+    speech = _speech_frames(db)
+    gap = VAD_MERGE_GAP_MS // VAD_FRAME_MS
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    pauses = [
+        (s, e) for s, e in _runs(~speech)
+        if e - s >= gap and speech[:s].sum() >= min_frames
+    ]
+    if pauses:
+        start, end = pauses[-1]
+        cut = (start + end) // 2
+    else:
+        max_frames = max(1, int(VAD_MAX_SEGMENT_S * 1000 / VAD_FRAME_MS))
+        if len(db) <= max_frames:
+            return None
+        cut = _split_long(0, len(db), db, max_frames)[0][1]
+    return int(cut) * frame_len * 2
+
+
+class VADStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.rejected = 0
+        self.audio_s = 0.0
+        self.removed_s = 0.0
+
+    def record(self, result: VADResult):
+        with self._lock:
+            self.clips += 1
+            self.rejected += 0 if result.has_speech else 1
+            self.audio_s += result.total_s
+            self.removed_s += result.removed_s
+
+    def snapshot(self, rtf=None) -> dict:
+        """`rtf` (decode s per audio s) turns removed audio into decode time saved."""
+        return {
+            "enabled": VAD_ENABLED,
+            "clips": self.clips,
+            "rejected_no_speech": self.rejected,
+            "audio_s": round(self.audio_s, 1),
+            "removed_s": round(self.removed_s, 1),
+            "removed_ratio": round(self.removed_s / self.audio_s, 4) if self.audio_s else None,
+            "decode_s_saved": round(self.removed_s * rtf, 1) if rtf else None,
+        }
+
+
+vad_stats = VADStats()
@@ -167,16 +167,7 @@ Respond now, starting with: "My Lord(s), in response to that..."
 """
 
 
-# ===============================
-# generate_rebuttal — main argument
-# ===============================
-def generate_rebuttal(
-    argument: str,
-    context,
-    party: str = "respondent",
-    preamble: str = ""
-) -> str:
-
+def _rebuttal_messages(argument: str, context, party: str, preamble: str) -> list:
     if isinstance(context, list):
         formatted_context = _format_context(context)
     else:
@@ -191,22 +182,37 @@ def generate_rebuttal(
     prompt = _build_prompt(argument, formatted_context, party, preamble)
     role   = PARTY_ROLES.get(party, PARTY_ROLES["respondent"])
 
+    return [
+        {
+            "role": "system",
+            "content": (
+                f"You are a senior {role['name'].lower()} advocate in a High Court moot. "
+                f"Build a COMPLETE independent case using the case facts and legal context. "
+                f"NEVER invent citations. NEVER concede. Stay in character."
+            )
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+
+# ===============================
+# generate_rebuttal — main argument
+# ===============================
+def generate_rebuttal(
+    argument: str,
+    context,
+    party: str = "respondent",
+    preamble: str = "",
+    timeout: float = None
+) -> str:
+
     try:
         res = client.chat.completions.create(
             model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are a senior {role['name'].lower()} advocate in a High Court moot. "
-                        f"Build a COMPLETE independent case using the case facts and legal context. "
-                        f"NEVER invent citations. NEVER concede. Stay in character."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=_rebuttal_messages(argument, context, party, preamble),
             max_tokens=2000,
             temperature=0.1,
+            timeout=timeout,
         )
         return res.choices[0].message.content.strip()
     except Exception as e:
@@ -214,6 +220,31 @@ def generate_rebuttal(
         return f"Error generating argument: {str(e)}"
 
 
+# ===============================
+# stream_rebuttal — same prompt, token stream
+# Lets TTS start on the first sentence while the rest is generated
+# ===============================
+def stream_rebuttal(
+    argument: str,
+    context,
+    party: str = "respondent",
+    preamble: str = "",
+    timeout: float = None
+):
+    stream = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=_rebuttal_messages(argument, context, party, preamble),
+        max_tokens=2000,
+        temperature=0.1,
+        stream=True,
+        timeout=timeout,
+    )
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+
 # ===============================
 # generate_judge_reply — short reply
 # ✅ New function — hard capped at 300 tokens
@@ -222,7 +253,8 @@ def generate_judge_reply(
     question: str,
     context,
     party: str = "respondent",
-    case_summary: str = ""
+    case_summary: str = "",
+    timeout: float = None
 ) -> str:
 
     if isinstance(context, list):
@@ -248,6 +280,7 @@ def generate_judge_reply(
             ],
             max_tokens=300,     # ✅ hard cap — forces short reply
             temperature=0.1,
+            timeout=timeout,
         )
         return res.choices[0].message.content.strip()
     except Exception as e:
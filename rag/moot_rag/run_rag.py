@@ -7,7 +7,7 @@ from typing import Dict, Tuple, Optional
 from rag.moot_rag.retrieval.hybrid_retriever import HybridRetriever
 from rag.moot_rag.retrieval.rerank_utils import rerank_if_available
 from rag.moot_rag.embeddings.embedder import embed_fn
-from rag.moot_rag.llm.groq_rebuttal import generate_rebuttal, generate_judge_reply
+from rag.moot_rag.llm.groq_rebuttal import generate_rebuttal, stream_rebuttal, generate_judge_reply
 from rag.moot_rag.database_ch.chroma_client import collection
 
 logger = logging.getLogger(__name__)
@@ -83,6 +83,22 @@ def _retrieve_and_rerank(case_key, case_type, query, top_k=15, final_k=5):
     return docs
 
 
+NON_SUBSTANTIVE_REPLY = "Please provide a substantive legal argument or question."
+
+
+def _build_preamble(case_key, history, case_type, case_summary, case_title) -> str:
+    """✅ Preamble with full case context."""
+    history_text = _build_history_text(history)
+    preamble_parts = [
+        f"CASE: {case_title}" if case_title else "",
+        f"CASE_KEY: {case_key}",
+        f"CASE_TYPE: {case_type or 'general'}",
+        f"CASE SUMMARY:\n{case_summary}" if case_summary else "",
+        f"HEARING HISTORY:\n{history_text}" if history_text.strip() else ""
+    ]
+    return "\n\n".join(p for p in preamble_parts if p)
+
+
 # ===============================
 # MAIN RESPONDENT ARGUMENT
 # ===============================
@@ -92,33 +108,25 @@ def run_opponent_rag(
     history: list,
     case_type: str = None,
     case_summary: str = "",    # ✅ new
-    case_title: str = ""       # ✅ new
+    case_title: str = "",      # ✅ new
+    timeout: float = None      # seconds left for the LLM call
 ) -> dict:
 
     if not _is_meaningful_input(argument):
         return {
-            "response": "Please provide a substantive legal argument or question.",
+            "response": NON_SUBSTANTIVE_REPLY,
             "sources": []
         }
 
-    history_text = _build_history_text(history)
     retrieved_docs = _retrieve_and_rerank(case_key, case_type, argument)
-
-    # ✅ Build preamble with full case context
-    preamble_parts = [
-        f"CASE: {case_title}" if case_title else "",
-        f"CASE_KEY: {case_key}",
-        f"CASE_TYPE: {case_type or 'general'}",
-        f"CASE SUMMARY:\n{case_summary}" if case_summary else "",
-        f"HEARING HISTORY:\n{history_text}" if history_text.strip() else ""
-    ]
-    preamble = "\n\n".join(p for p in preamble_parts if p)
+    preamble = _build_preamble(case_key, history, case_type, case_summary, case_title)
 
     rebuttal = generate_rebuttal(
         argument=argument,
         context=retrieved_docs,
         party="respondent",
-        preamble=preamble
+        preamble=preamble,
+        timeout=timeout
     )
 
     return {
@@ -127,6 +135,35 @@ def run_opponent_rag(
     }
 
 
+# ===============================
+# MAIN RESPONDENT ARGUMENT — streamed
+# Yields text deltas; used by the sentence-pipelined TTS path
+# ===============================
+def stream_opponent_rag(
+    case_key: str,
+    argument: str,
+    history: list,
+    case_type: str = None,
+    case_summary: str = "",
+    case_title: str = "",
+    timeout: float = None
+):
+    if not _is_meaningful_input(argument):
+        yield NON_SUBSTANTIVE_REPLY
+        return
+
+    retrieved_docs = _retrieve_and_rerank(case_key, case_type, argument)
+    preamble = _build_preamble(case_key, history, case_type, case_summary, case_title)
+
+    yield from stream_rebuttal(
+        argument=argument,
+        context=retrieved_docs,
+        party="respondent",
+        preamble=preamble,
+        timeout=timeout
+    )
+
+
 # ===============================
 # JUDGE REPLY — short, focused
 # ✅ New function — does NOT use full argument prompt
@@ -136,7 +173,8 @@ def run_judge_reply(
     judge_question: str,
     history: list,
     case_type: str = None,
-    case_summary: str = ""
+    case_summary: str = "",
+    timeout: float = None
 ) -> dict:
 
     # Retrieve small focused context for judge question only
@@ -149,7 +187,8 @@ def run_judge_reply(
         question=judge_question,
         context=retrieved_docs,
         case_summary=case_summary,
-        party="respondent"
+        party="respondent",
+        timeout=timeout
     )
 
     return {